@@ -1,91 +1,79 @@
+import argparse
+import asyncio
+import json
+import numpy as np
 import pandas as pd
-from binance.client import Client
-from ta.momentum import RSIIndicator
 from dotenv import load_dotenv
 import os
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
 import xlsxwriter
+from candle_cache import array_to_frame
+from history import fetch_klines_range
+from market_data import INTERVAL_MS, BinanceAsyncClient, WeightBudget
+from ohlcv_store import OHLCVStore
+from strategy import SYMBOLS, TIMEFRAMES, frame_indicators, signal_masks
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Credenciais Binance
+# Credenciais Binance (os endpoints de mercado não exigem assinatura)
 api_key_spot = os.getenv("api_key_spot")
-api_secret_spot = os.getenv("api_secret_spot")
 
-# Inicializar o cliente Binance
-client = Client(api_key_spot, api_secret_spot)
+# Páginas de histórico baixadas em paralelo por par/timeframe
+HISTORY_CONCURRENCY = 10
 
-# Lista de pares de moedas
-symbol_list = [
-    "BTCUSDT", "ETHUSDT", "BNBUSDT", "DOTUSDT", "DOGEUSDT", "FTMUSDT", "ASTRUSDT", "XRPUSDT", "SOLUSDT", 
-    "LTCUSDT", "AAVEUSDT", "ORDIUSDT", "UNIUSDT", "LINKUSDT", 
-    "ENSUSDT", "MOVRUSDT", "ARBUSDT", "TRBUSDT", "MANTAUSDT", "AVAXUSDT", "ADAUSDT", "GALAUSDT", "LDOUSDT"
-]
+# Orçamento de peso da API compartilhado por todos os downloads (inclusive entre threads)
+weight_budget = WeightBudget()
 
-# Lista de timeframes disponíveis
-timeframes = ["1m", "5m", "15m", "1h", "4h", "1d"]
+# Pares e timeframes testados (os mesmos da interface)
+symbol_list = SYMBOLS
+timeframes = TIMEFRAMES
+
+# Histórico local de velas (evita baixar de novo o que já foi baixado)
+ohlcv_store = OHLCVStore()
 
 # Funções auxiliares
-def fetch_historical_data(symbol, timeframe, limit=1000, max_data_points=1000):
+async def download_klines(symbol, timeframe, ranges, limit=1000):
+    """Baixa os intervalos [início, fim] de open_time em uma única sessão, com páginas em paralelo."""
+    async with BinanceAsyncClient(api_key_spot, max_concurrency=HISTORY_CONCURRENCY,
+                                  weight_budget=weight_budget) as client:
+        return await asyncio.gather(*(fetch_klines_range(client, symbol, timeframe, start, end, limit)
+                                      for start, end in ranges))
+
+def fetch_historical_data(symbol, timeframe, limit=1000, max_data_points=1000, offline=False):
     """
-    Busca o máximo de dados históricos, segmentados em múltiplas solicitações.
+    Retorna as últimas `max_data_points` velas a partir do cache local em disco.
+    Só o trecho que falta é baixado: as velas posteriores à última salva e, se o cache
+    ainda for curto, o histórico anterior. Com offline=True nenhuma requisição é feita.
     """
-    all_data = []
-    last_timestamp = None  # Inicializar com None para começar com os dados mais recentes
-    
-    while len(all_data) < max_data_points:
+    # Com download, o arquivo é substituído pelo merge: sem mmap, nenhum mapeamento fica aberto
+    # sobre ele (no Windows o os.replace falharia e o backtest seguiria com dados antigos)
+    rows = ohlcv_store.load(symbol, timeframe, mmap=offline)
+
+    if not offline:
+        step = INTERVAL_MS[timeframe]
+        now = int(time.time() * 1000)
+        first_wanted = (now // step - max_data_points + 1) * step
+        if not len(rows):
+            ranges = [(first_wanted, now)]
+        else:
+            # Da última vela salva (que pode ter sido gravada em formação) até agora e,
+            # se o cache for curto, o trecho anterior à primeira vela salva
+            ranges = [(int(rows['open_time'][-1]), now)]
+            if rows['open_time'][0] > first_wanted:
+                ranges.append((first_wanted, int(rows['open_time'][0]) - 1))
         try:
-            candles = client.get_klines(
-                symbol=symbol, 
-                interval=timeframe, 
-                limit=limit, 
-                endTime=last_timestamp
-            )
-            
-            if not candles:
-                break  # Para quando não houver mais dados disponíveis
-            
-            # Adicionar dados ao conjunto
-            all_data.extend(candles)
-            
-            # Atualizar o timestamp para a próxima solicitação
-            last_timestamp = candles[0][0]  # Usar o timestamp inicial da primeira vela
-            time.sleep(1)  # Pequeno delay para evitar limitações de taxa da API
-        
+            new_candles = np.concatenate(asyncio.run(download_klines(symbol, timeframe, ranges, limit)))
+            if len(new_candles):
+                rows = ohlcv_store.merge(symbol, timeframe, new_candles)
         except Exception as e:
             print(f"Erro ao buscar dados para {symbol} ({timeframe}): {e}")
-            break
-
-    # Converter para DataFrame
-    df = pd.DataFrame(all_data, columns=[
-        'open_time', 'open', 'high', 'low', 'close', 'volume', 
-        'close_time', 'quote_asset_volume', 'number_of_trades', 
-        'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-    ])
-    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
-    df['open'] = df['open'].astype(float)
-    df['high'] = df['high'].astype(float)
-    df['low'] = df['low'].astype(float)
-    df['close'] = df['close'].astype(float)
-    df['volume'] = df['volume'].astype(float)
-    return df[:max_data_points]  # Retorna até o máximo permitido
-
-def calculate_bollinger_bands(df, num_periods=21, std_dev_factor=2):
-    df['SMA'] = df['close'].rolling(window=num_periods).mean()
-    df['std_dev'] = df['close'].rolling(window=num_periods).std()
-    df['upper_band'] = df['SMA'] + (std_dev_factor * df['std_dev'])
-    df['lower_band'] = df['SMA'] - (std_dev_factor * df['std_dev'])
-    return df
-
-def calculate_stochastic_oscillator(df, k_period=14, d_period=3):
-    df['L14'] = df['low'].rolling(window=k_period).min()
-    df['H14'] = df['high'].rolling(window=k_period).max()
-    df['%K'] = ((df['close'] - df['L14']) / (df['H14'] - df['L14'])) * 100
-    df['%D'] = df['%K'].rolling(window=d_period).mean()
-    return df
+
+    if not len(rows):
+        raise ValueError(f"Sem dados históricos para {symbol} ({timeframe})")
+    return array_to_frame(rows[-max_data_points:])  # Retorna até o máximo permitido
 
 def calculate_drawdown(trades):
     """
@@ -121,37 +109,45 @@ def calculate_hit_rate(trades):
     hit_rate = (wins / total_trades) * 100 if total_trades > 0 else 0
     return hit_rate, total_trades
 
-def backtest_strategy(symbol, timeframe, initial_balance=100, trade_size=0.1):
-    # Baixa os dados históricos
-    df = fetch_historical_data(symbol, timeframe, max_data_points=1000)
-
-    # Calcula os indicadores técnicos
-    df = calculate_bollinger_bands(df)
-    df = calculate_stochastic_oscillator(df)
-    rsi = RSIIndicator(df['close'], window=14)
-    df['rsi'] = rsi.rsi()
+def simulate_trades(close, buy_signal, sell_signal, initial_balance=100, trade_size=0.1):
+    """
+    Resolve a máquina de estados comprado/zerado sobre arrays NumPy.
 
-    # Variáveis de backtest
+    Só os candles com sinal de compra ou venda são visitados; retorna o saldo, a posição
+    final e a lista de operações como tuplas (tipo, índice, preço, quantidade).
+    """
     balance = initial_balance
-    position = 0  # 0 = sem posição, >0 = comprado
-    trades = []
-
-    # Simula a estratégia
-    for i in range(len(df)):
-        price = df['close'].iloc[i]
+    position = 0
+    events = []
+    for i in np.flatnonzero(buy_signal | sell_signal):
+        price = close[i]
         if position == 0:
-            # Sinal de compra
-            if price < df['lower_band'].iloc[i] and df['%K'].iloc[i] < 20 and df['rsi'].iloc[i] < 30:
+            if buy_signal[i]:
                 amount = balance * trade_size / price
                 balance -= amount * price
                 position += amount
-                trades.append({'type': 'BUY', 'price': price, 'size': amount, 'time': df['open_time'].iloc[i]})
-        elif position > 0:
-            # Sinal de venda
-            if price > df['upper_band'].iloc[i] and df['%K'].iloc[i] > 80 and df['rsi'].iloc[i] > 70:
-                balance += position * price
-                trades.append({'type': 'SELL', 'price': price, 'size': position, 'time': df['open_time'].iloc[i]})
-                position = 0
+                events.append(('BUY', i, price, amount))
+        elif position > 0 and sell_signal[i]:
+            balance += position * price
+            events.append(('SELL', i, price, position))
+            position = 0
+    return balance, position, events
+
+def run_backtest(df, initial_balance=100, trade_size=0.1):
+    """
+    Executa a estratégia sobre um DataFrame de velas já carregado.
+    """
+    # Indicadores e máscaras de entrada e saída, com a mesma regra do monitor
+    close = df['close'].to_numpy()
+    buy_signal, sell_signal = signal_masks(close, frame_indicators(df))
+
+    # Simula a estratégia
+    balance, position, events = simulate_trades(close, buy_signal, sell_signal, initial_balance, trade_size)
+    open_time = df['open_time']
+    trades = [
+        {'type': kind, 'price': price, 'size': size, 'time': open_time.iloc[i]}
+        for kind, i, price, size in events
+    ]
 
     # Calcula métricas
     final_balance = balance + (position * df['close'].iloc[-1] if position > 0 else 0)
@@ -166,35 +162,160 @@ def backtest_strategy(symbol, timeframe, initial_balance=100, trade_size=0.1):
         "total_trades": total_trades
     }
 
-# Configuração principal
-if __name__ == "__main__":
-    excel_file = f"backtesting_results_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
-    with pd.ExcelWriter(excel_file, engine='xlsxwriter') as writer:
-        for symbol in symbol_list:
-            results = []
-            for timeframe in timeframes:
-                print(f"Iniciando backtest para {symbol} no timeframe {timeframe}...")
+def backtest_strategy(symbol, timeframe, initial_balance=100, trade_size=0.1, offline=False):
+    # Carrega os dados históricos (cache local + velas que faltam)
+    df = fetch_historical_data(symbol, timeframe, max_data_points=1000, offline=offline)
+    return run_backtest(df, initial_balance, trade_size)
+
+# Execução em paralelo
+RESULT_COLUMNS = ["Final Balance", "Profit", "Max Drawdown (%)", "Hit Rate (%)", "Total Trades"]
+
+def metrics_to_row(symbol, timeframe, metrics, error=None):
+    row = {"Symbol": symbol, "Timeframe": timeframe, "Error": error}
+    values = [None] * len(RESULT_COLUMNS) if metrics is None else [
+        metrics["final_balance"], metrics["profit"], metrics["max_drawdown"],
+        metrics["hit_rate"], metrics["total_trades"]
+    ]
+    # Converte escalares NumPy para tipos nativos (serializáveis em JSON)
+    row.update(zip(RESULT_COLUMNS, (v.item() if hasattr(v, "item") else v for v in values)))
+    return row
+
+class ProgressJournal:
+    """
+    Grava cada resultado assim que fica pronto (um JSON por linha), permitindo
+    retomar uma execução interrompida sem repetir os backtests já concluídos.
+    Backtests que falharam são executados de novo ao retomar.
+
+    A primeira linha guarda os parâmetros da execução (`params`); um journal criado com
+    outros parâmetros é descartado (`discarded` conta os resultados perdidos), já que os
+    resultados não seriam comparáveis. Uma linha truncada por uma interrupção no meio da
+    escrita é ignorada e removida do arquivo.
+    """
+
+    def __init__(self, path, params=None):
+        self.path = path
+        self.params = dict(params or {})
+        self.rows = {}
+        self.discarded = 0
+
+        records, clean = self._read(path)
+        if records and records[0].get("params") == self.params:
+            for row in records[1:]:
+                self.rows[(row["Symbol"], row["Timeframe"])] = row
+        else:
+            self.discarded = sum(1 for record in records if "Symbol" in record)
+            clean = False
+        if not clean:
+            self._rewrite()
+        self._file = open(path, "a", encoding="utf-8")
+
+    @staticmethod
+    def _read(path):
+        """Retorna (registros válidos, se o arquivo está íntegro)."""
+        if not os.path.exists(path):
+            return [], False
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        records = []
+        clean = content.endswith("\n")
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                clean = False
+        return records, clean
+
+    def _rewrite(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"params": self.params}) + "\n")
+            for row in self.rows.values():
+                f.write(json.dumps(row) + "\n")
+        os.replace(temp_path, self.path)
+
+    def __contains__(self, key):
+        return key in self.rows and self.rows[key]["Error"] is None
+
+    def write(self, row):
+        self.rows[(row["Symbol"], row["Timeframe"])] = row
+        self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def run_grid(symbols, timeframes, journal, jobs=None, io_jobs=4, offline=False, max_data_points=1000, verbose=True):
+    """
+    Executa o backtest para todas as combinações (par, timeframe) ainda não concluídas.
+
+    O carregamento dos dados (disco/rede) roda em threads e a simulação, que usa CPU,
+    em um pool de processos; cada resultado vai para o journal assim que termina.
+    """
+    pending_keys = [(s, tf) for s in symbols for tf in timeframes if (s, tf) not in journal]
+    if verbose and len(pending_keys) < len(symbols) * len(timeframes):
+        print(f"Retomando execução: {len(symbols) * len(timeframes) - len(pending_keys)} backtests já concluídos.")
+
+    with ThreadPoolExecutor(max_workers=io_jobs) as loaders, ProcessPoolExecutor(max_workers=jobs) as workers:
+        pending = {
+            loaders.submit(fetch_historical_data, symbol, timeframe,
+                           max_data_points=max_data_points, offline=offline): ("load", (symbol, timeframe))
+            for symbol, timeframe in pending_keys
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, (symbol, timeframe) = pending.pop(future)
                 try:
-                    metrics = backtest_strategy(symbol, timeframe)
-                    results.append({
-                        "Timeframe": timeframe,
-                        "Final Balance": metrics["final_balance"],
-                        "Profit": metrics["profit"],
-                        "Max Drawdown (%)": metrics["max_drawdown"],
-                        "Hit Rate (%)": metrics["hit_rate"],
-                        "Total Trades": metrics["total_trades"]
-                    })
+                    result = future.result()
                 except Exception as e:
                     print(f"Erro no backtest para {symbol} ({timeframe}): {e}")
-                    results.append({
-                        "Timeframe": timeframe,
-                        "Final Balance": None,
-                        "Profit": None,
-                        "Max Drawdown (%)": None,
-                        "Hit Rate (%)": None,
-                        "Total Trades": None
-                    })
-            df = pd.DataFrame(results)
+                    journal.write(metrics_to_row(symbol, timeframe, None, str(e)))
+                    continue
+                if stage == "load":
+                    if verbose:
+                        print(f"Iniciando backtest para {symbol} no timeframe {timeframe}...")
+                    pending[workers.submit(run_backtest, result)] = ("backtest", (symbol, timeframe))
+                else:
+                    journal.write(metrics_to_row(symbol, timeframe, result))
+
+def save_excel(rows, symbols, timeframes, excel_file):
+    """Uma planilha por par, com os timeframes na ordem configurada."""
+    with pd.ExcelWriter(excel_file, engine='xlsxwriter') as writer:
+        for symbol in symbols:
+            results = [
+                {"Timeframe": timeframe, **{c: rows[(symbol, timeframe)][c] for c in RESULT_COLUMNS}}
+                for timeframe in timeframes if (symbol, timeframe) in rows
+            ]
+            df = pd.DataFrame(results, columns=["Timeframe"] + RESULT_COLUMNS)
             df.to_excel(writer, sheet_name=symbol[:31], index=False)
 
+# Configuração principal
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest da estratégia para todos os pares e timeframes.")
+    parser.add_argument("--offline", action="store_true", help="usa apenas o histórico salvo em disco")
+    parser.add_argument("--data-dir", default=ohlcv_store.root, help="diretório do histórico local de velas")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="processos para a simulação")
+    parser.add_argument("--io-jobs", type=int, default=4, help="threads para carregar os dados")
+    parser.add_argument("--bars", type=int, default=1000, help="quantidade de velas por backtest")
+    parser.add_argument("--progress", default="backtesting_progress.jsonl",
+                        help="arquivo de progresso usado para retomar uma execução interrompida")
+    args = parser.parse_args()
+    ohlcv_store.root = args.data_dir
+
+    journal = ProgressJournal(args.progress, params={"bars": args.bars, "offline": args.offline})
+    if journal.discarded:
+        print(f"Progresso anterior descartado ({journal.discarded} resultados): "
+              f"foi gravado com outros parâmetros (--bars/--offline).")
+    try:
+        run_grid(symbol_list, timeframes, journal, jobs=args.jobs, io_jobs=args.io_jobs,
+                 offline=args.offline, max_data_points=args.bars)
+    finally:
+        journal.close()
+
+    excel_file = f"backtesting_results_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+    save_excel(journal.rows, symbol_list, timeframes, excel_file)
+    os.remove(args.progress)  # Execução concluída; a próxima começa do zero
+
     print(f"Resultados salvos no arquivo: {excel_file}")
@@ -0,0 +1,659 @@
+"""
+Benchmarks locais, executados contra servidores stub (sem acesso à Binance).
+
+Uso: python benchmarks.py [nome ...]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from aiohttp import web
+from ta.momentum import RSIIndicator
+
+from candle_cache import KLINE_DTYPE, CandleCache, array_to_frame, decode_klines, klines_to_array
+from panel import PanelIndicators, evaluate_indicators
+from history import fetch_klines_range, page_ranges
+from market_data import INTERVAL_MS, KLINES_WEIGHT, BinanceAsyncClient, WeightBudget
+from metrics import Metrics
+from notifier import TelegramNotifier
+from ohlcv_store import OHLCVStore
+from replay import replay
+from strategy import TIMEFRAMES, IndicatorEngine, StreamingIndicators, batch_indicators, evaluate_signal, signal_labels, signal_masks
+from streaming import KlineStream
+
+SCAN_TIMEFRAMES = TIMEFRAMES
+
+
+def _compact_json(obj):
+    # Mesmo formato da Binance: JSON sem espaços
+    return json.dumps(obj, separators=(",", ":"))
+
+
+# Início das velas dos stubs, alinhado ao minuto como as velas da Binance
+STUB_START = 1_700_000_000_000 // 60_000 * 60_000
+
+
+def _fake_klines(limit, start=STUB_START, step=60_000):
+    return [
+        [start + i * step, "100.0", "101.0", "99.0", "100.5", "10.0",
+         start + (i + 1) * step - 1, "1000.0", 10, "5.0", "500.0", "0"]
+        for i in range(limit)
+    ]
+
+
+async def start_stub_binance(latency=0.05, port=0, weight_limit=None, weight_window=60, invalid_symbols=()):
+    """
+    Sobe um servidor local que imita os endpoints de mercado da Binance com latência fixa.
+
+    As klines respeitam startTime/endTime e cada resposta traz o cabeçalho
+    X-MBX-USED-WEIGHT-1M; com `weight_limit`, o excesso na janela recebe HTTP 429.
+    Pares em `invalid_symbols` recebem HTTP 400, como um par inexistente ou deslistado.
+    Contadores ficam em `runner.app["stats"]`. Retorna (runner, base_url).
+    """
+    stats = {"requests": 0, "rejected": 0, "max_used": 0, "window": None, "used": 0}
+
+    async def klines(request):
+        await asyncio.sleep(latency)
+        window = int(time.time() // weight_window)
+        if stats["window"] != window:
+            stats["window"], stats["used"] = window, 0
+        stats["requests"] += 1
+        stats["used"] += KLINES_WEIGHT
+        stats["max_used"] = max(stats["max_used"], stats["used"])
+        headers = {"X-MBX-USED-WEIGHT-1M": str(stats["used"])}
+        if weight_limit is not None and stats["used"] > weight_limit:
+            stats["rejected"] += 1
+            return web.json_response({"code": -1003, "msg": "Too many requests"}, status=429,
+                                     headers={**headers, "Retry-After": str(weight_window)})
+
+        query = request.query
+        if query.get("symbol") in invalid_symbols:
+            return web.json_response({"code": -1121, "msg": "Invalid symbol."}, status=400, headers=headers)
+        limit = int(query.get("limit", 500))
+        step = INTERVAL_MS.get(query.get("interval"), 60_000)
+        if "startTime" in query:
+            start = -(-int(query["startTime"]) // step) * step
+            end = int(query.get("endTime", time.time() * 1000))
+            rows = _fake_klines(max(0, min(limit, (end - start) // step + 1)), start, step)
+        elif "endTime" in query:
+            end = int(query["endTime"]) // step * step
+            rows = _fake_klines(limit, end - (limit - 1) * step, step)
+        else:
+            rows = _fake_klines(limit)
+        return web.json_response(rows, dumps=_compact_json, headers=headers)
+
+    async def ticker(request):
+        await asyncio.sleep(latency)
+        symbol = request.query.get("symbol")
+        if symbol:
+            return web.json_response({"symbol": symbol, "price": "100.5"})
+        return web.json_response([{"symbol": f"PAR{i}USDT", "price": "100.5"} for i in range(50)])
+
+    async def server_time(request):
+        return web.json_response({"serverTime": int(time.time() * 1000)})
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_get("/api/v3/klines", klines)
+    app.router.add_get("/api/v3/ticker/price", ticker)
+    app.router.add_get("/api/v3/time", server_time)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _fake_kline_events(symbols, timeframe, n_candles, updates_per_candle=3, start=STUB_START, step=60_000):
+    """Eventos de kline como os do stream combinado, com atualizações da vela em formação."""
+    events = []
+    for i in range(n_candles):
+        open_time = start + i * step
+        for update in range(updates_per_candle):
+            for symbol in symbols:
+                events.append({
+                    "stream": f"{symbol.lower()}@kline_{timeframe}",
+                    "data": {"e": "kline", "s": symbol, "k": {
+                        "t": open_time, "T": open_time + step - 1, "i": timeframe,
+                        "o": "100.0", "h": "101.0", "l": "99.0", "c": str(100 + update), "v": "10.0",
+                        "x": update == updates_per_candle - 1,
+                    }},
+                })
+    return events
+
+
+async def start_stub_kline_stream(events, port=0, later_events=None):
+    """
+    Sobe um servidor WebSocket local que reproduz `events` na primeira conexão (e
+    `later_events`, se informado, nas seguintes) e depois encerra a conexão, forçando
+    o cliente a reconectar. Retorna (runner, base_url).
+    """
+    connections = 0
+
+    async def stream(request):
+        nonlocal connections
+        connections += 1
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for event in events if connections == 1 or later_events is None else later_events:
+            await ws.send_json(event)
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/stream", stream)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def start_stub_telegram(rate_limited_requests=1, port=0):
+    """
+    Sobe um endpoint local que imita o sendMessage da Bot API. As primeiras
+    `rate_limited_requests` chamadas recebem 429 com Retry-After. Retorna
+    (runner, base_url, mensagens_recebidas).
+    """
+    received = []
+    calls = 0
+
+    async def send_message(request):
+        nonlocal calls
+        calls += 1
+        if calls <= rate_limited_requests:
+            return web.json_response(
+                {"ok": False, "error_code": 429, "parameters": {"retry_after": 0}},
+                status=429, headers={"Retry-After": "0"},
+            )
+        payload = await request.json()
+        received.append(payload["text"])
+        return web.json_response({"ok": True, "result": {"message_id": len(received)}})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/sendMessage", send_message)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}", received
+
+
+async def _scan(client, symbols, timeframes):
+    await asyncio.gather(*(
+        asyncio.gather(client.get_klines(symbol, timeframe, limit=50), client.get_symbol_ticker(symbol))
+        for symbol in symbols for timeframe in timeframes
+    ))
+
+
+async def _bench_scan(latency=0.05):
+    runner, base_url = await start_stub_binance(latency)
+    try:
+        print(f"Varredura completa ({len(SCAN_TIMEFRAMES)} timeframes, latência stub {latency * 1000:.0f} ms)")
+        for concurrency in (1, 10, 50):
+            for n_symbols in (6, 24):
+                async with BinanceAsyncClient(base_url=base_url, max_concurrency=concurrency) as client:
+                    start = time.perf_counter()
+                    await _scan(client, [f"PAR{i}USDT" for i in range(n_symbols)], SCAN_TIMEFRAMES)
+                    elapsed = time.perf_counter() - start
+                print(f"  concorrência={concurrency:>3}  pares={n_symbols:>3}  tempo={elapsed:6.2f}s")
+    finally:
+        await runner.cleanup()
+
+
+def bench_scan():
+    """Tempo de uma varredura de mercado em função da concorrência e do número de pares."""
+    asyncio.run(_bench_scan())
+
+
+async def _bench_stream(n_symbols=24, n_candles=200, gap=10, start=STUB_START, step=60_000):
+    symbols = [f"PAR{i}USDT" for i in range(n_symbols)]
+    # A segunda conexão recomeça `gap` velas depois da última recebida: o backfill deve preenchê-las
+    events = _fake_kline_events(symbols, "1m", n_candles, start=start)
+    later_events = _fake_kline_events(symbols, "1m", n_candles, start=start + (n_candles + gap) * step)
+    rest_runner, rest_url = await start_stub_binance(latency=0, invalid_symbols={"INVALIDUSDT"})
+    ws_runner, ws_url = await start_stub_kline_stream(events, later_events=later_events)
+    received = 0
+    backfill_errors = []
+    after_reconnect = {}
+    done = asyncio.Event()
+
+    async def on_candle(symbol, timeframe, ring, closed):
+        nonlocal received
+        received += 1
+        if received == len(events) + 1:
+            # Primeiro evento da nova conexão: o backfill já terminou e a lacuna ainda está no buffer
+            after_reconnect.update({symbol: cache.ring(symbol, "1m").to_array()["open_time"] for symbol in symbols})
+        if received == len(events) + len(later_events):
+            done.set()
+
+    try:
+        async with BinanceAsyncClient(base_url=rest_url) as client:
+            # Relógio no instante da reconexão, para o cache pedir só as velas da lacuna
+            cache = CandleCache(capacity=50, clock=lambda: (start + (n_candles + gap) * step) / 1000)
+            # Um par inválido no universo não pode impedir o stream dos demais
+            stream = KlineStream(client, cache, symbols + ["INVALIDUSDT"], ["1m"], on_candle, base_url=ws_url,
+                                 reconnect_delay=0,
+                                 on_backfill_error=lambda symbol, timeframe, e: backfill_errors.append(symbol))
+            began = time.perf_counter()
+            task = asyncio.create_task(stream.run())
+            await asyncio.wait_for(done.wait(), timeout=60)
+            elapsed = time.perf_counter() - began
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    finally:
+        await ws_runner.cleanup()
+        await rest_runner.cleanup()
+
+    gap_times = start + np.arange(n_candles, n_candles + gap) * step
+    for symbol, open_times in after_reconnect.items():
+        assert np.isin(gap_times, open_times).all(), f"lacuna não preenchida em {symbol}"
+        assert np.all(np.diff(open_times) == step), f"velas fora de sequência em {symbol}"
+    assert backfill_errors == ["INVALIDUSDT"] * 2, backfill_errors
+    print(f"Stream de klines: {received} eventos em {elapsed:.2f}s "
+          f"({received / elapsed:,.0f} eventos/s, {len(symbols)} pares, 1 reconexão com lacuna de {gap} velas "
+          f"preenchida via REST; par inválido ignorado no backfill)")
+
+
+def bench_stream():
+    """Vazão do processamento de eventos de kline reproduzidos por um WebSocket local."""
+    asyncio.run(_bench_stream())
+
+
+def _random_candles(n, seed=0, step=60_000, spike_rate=0.0):
+    rng = np.random.default_rng(seed)
+    rows = np.zeros(n, dtype=KLINE_DTYPE)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    rows["open_time"] = 1_700_000_000_000 + np.arange(n) * step
+    rows["close_time"] = rows["open_time"] + step - 1
+    rows["open"] = close * (1 + rng.normal(0, 0.005, n))
+    rows["high"] = np.maximum(rows["open"], close) * (1 + rng.random(n) * 0.01)
+    rows["low"] = np.minimum(rows["open"], close) * (1 - rng.random(n) * 0.01)
+    rows["close"] = close
+    rows["volume"] = rng.random(n) * 100
+    # Picos de volume ocasionais, para que o filtro de volume da estratégia seja atingido
+    rows["volume"][rng.random(n) < spike_rate] *= 10
+    return rows
+
+
+def _pandas_indicators(df):
+    """Indicadores calculados como no main.py original (pandas/ta, janela inteira a cada consulta)."""
+    df['SMA'] = df['close'].rolling(window=21).mean()
+    df['std_dev'] = df['close'].rolling(window=21).std()
+    df['upper_band'] = df['SMA'] + (2 * df['std_dev'])
+    df['lower_band'] = df['SMA'] - (2 * df['std_dev'])
+    df['L14'] = df['low'].rolling(window=14).min()
+    df['H14'] = df['high'].rolling(window=14).max()
+    df['%K'] = ((df['close'] - df['L14']) / (df['H14'] - df['L14'])) * 100
+    df['%D'] = df['%K'].rolling(window=3).mean()
+    df['rsi'] = RSIIndicator(df['close'], window=14).rsi()
+    df['volume_ma'] = df['volume'].rolling(window=21).mean()
+    return df
+
+
+def bench_indicators(n=2000, window=50):
+    """Paridade e custo por atualização: motor incremental vs. recálculo com pandas."""
+    rows = _random_candles(n)
+    expected = _pandas_indicators(array_to_frame(rows))
+    state = StreamingIndicators()
+    max_error = 0.0
+    for i in range(n):
+        values = state.push(rows["high"][i], rows["low"][i], rows["close"][i], rows["volume"][i])
+        for name in ("upper_band", "lower_band", "%K", "%D", "rsi", "volume_ma"):
+            if not np.isnan(expected[name].iloc[i]):
+                max_error = max(max_error, abs(values[name] - expected[name].iloc[i]))
+    print(f"Indicadores: erro absoluto máximo vs. pandas/ta = {max_error:.2e} ({n} velas)")
+    batch = batch_indicators(rows["high"], rows["low"], rows["close"], rows["volume"])
+    batch_error = max(np.nanmax(np.abs(batch[name] - expected[name].to_numpy()))
+                      for name in ("upper_band", "lower_band", "%K", "%D", "rsi", "volume_ma"))
+    print(f"  kernels em lote: erro absoluto máximo vs. pandas/ta = {batch_error:.2e}")
+
+    state = StreamingIndicators()
+    start = time.perf_counter()
+    for i in range(n):
+        state.update(rows[max(0, i - window + 1):i + 1])
+    incremental = (time.perf_counter() - start) / n
+
+    start = time.perf_counter()
+    for i in range(window, window + 200):
+        _pandas_indicators(array_to_frame(rows[i - window:i]))
+    full = (time.perf_counter() - start) / 200
+    print(f"  incremental: {incremental * 1e6:8.1f} µs/atualização")
+    print(f"  pandas ({window} velas): {full * 1e6:8.1f} µs/atualização  ({full / incremental:.0f}x)")
+
+
+def _reference_simulation(df, initial_balance=100, trade_size=0.1):
+    """
+    Laço original do backtest_strategy (iloc por linha), mantido como referência, com a
+    regra completa do monitor (%D e filtro de volume incluídos).
+    """
+    balance = initial_balance
+    position = 0
+    trades = []
+    for i in range(len(df)):
+        price = df['close'].iloc[i]
+        high_volume = df['volume'].iloc[i] > 3 * df['volume_ma'].iloc[i]
+        if position == 0:
+            if (price < df['lower_band'].iloc[i] and df['%K'].iloc[i] < 20 and df['%D'].iloc[i] < 20
+                    and high_volume and df['rsi'].iloc[i] < 30):
+                amount = balance * trade_size / price
+                balance -= amount * price
+                position += amount
+                trades.append({'type': 'BUY', 'price': price, 'size': amount, 'time': df['open_time'].iloc[i]})
+        elif position > 0:
+            if (price > df['upper_band'].iloc[i] and df['%K'].iloc[i] > 80 and df['%D'].iloc[i] > 80
+                    and high_volume and df['rsi'].iloc[i] > 70):
+                balance += position * price
+                trades.append({'type': 'SELL', 'price': price, 'size': position, 'time': df['open_time'].iloc[i]})
+                position = 0
+    final_balance = balance + (position * df['close'].iloc[-1] if position > 0 else 0)
+    return final_balance, trades
+
+
+def bench_backtest(sizes=(1_000, 100_000, 1_000_000), reference_limit=100_000):
+    """Backtest vetorizado vs. laço original com iloc (o laço só roda até `reference_limit` velas)."""
+    import backtesting
+
+    print("Backtest (indicadores + simulação + métricas)")
+    for n in sizes:
+        df = array_to_frame(_random_candles(n, seed=n, spike_rate=0.05))
+        start = time.perf_counter()
+        metrics = backtesting.run_backtest(df.copy())
+        vectorized = time.perf_counter() - start
+        line = f"  {n:>9,} velas  vetorizado={vectorized:7.3f}s  operações={metrics['total_trades']}"
+        if n <= reference_limit:
+            reference_df = _pandas_indicators(df.copy())
+            start = time.perf_counter()
+            final_balance, trades = _reference_simulation(reference_df)
+            reference = time.perf_counter() - start
+            hit_rate, total_trades = backtesting.calculate_hit_rate(trades)
+            assert final_balance == metrics["final_balance"]
+            assert backtesting.calculate_drawdown(trades) == metrics["max_drawdown"]
+            assert (hit_rate, total_trades) == (metrics["hit_rate"], metrics["total_trades"])
+            line += f"  laço iloc (só simulação)={reference:7.3f}s  resultados idênticos"
+        print(line)
+
+
+def bench_runner(n_symbols=8, bars=200_000, job_counts=(1, 2, 4)):
+    """Speedup do executor paralelo de backtests sobre dados já em cache (modo offline)."""
+    import backtesting
+    from backtesting import ProgressJournal, run_grid
+
+    symbols = [f"PAR{i}USDT" for i in range(n_symbols)]
+    grid_timeframes = ["1m", "5m"]
+    with tempfile.TemporaryDirectory() as data_dir:
+        backtesting.ohlcv_store.root = data_dir
+        for i, symbol in enumerate(symbols):
+            for timeframe in grid_timeframes:
+                backtesting.ohlcv_store.save(symbol, timeframe, _random_candles(bars, seed=i))
+
+        print(f"Executor paralelo ({n_symbols} pares x {len(grid_timeframes)} timeframes, {bars:,} velas, offline)")
+        baseline = None
+        for jobs in job_counts:
+            journal = ProgressJournal(os.path.join(data_dir, f"progress_{jobs}.jsonl"))
+            start = time.perf_counter()
+            run_grid(symbols, grid_timeframes, journal, jobs=jobs, offline=True, max_data_points=bars, verbose=False)
+            elapsed = time.perf_counter() - start
+            journal.close()
+            baseline = baseline or elapsed
+            print(f"  jobs={jobs}  tempo={elapsed:6.2f}s  speedup={baseline / elapsed:4.1f}x")
+
+
+def bench_sweep(sizes=(1_000, 10_000)):
+    """Vazão da varredura de parâmetros em combinações por segundo."""
+    from sweep import DEFAULT_GRID, run_sweep
+
+    print("Varredura de parâmetros (grade padrão)")
+    for n in sizes:
+        df = array_to_frame(_random_candles(n, seed=n, spike_rate=0.05))
+        start = time.perf_counter()
+        table = run_sweep(df, DEFAULT_GRID)
+        elapsed = time.perf_counter() - start
+        print(f"  {n:>7,} velas  {len(table)} combinações em {elapsed:5.2f}s  ({len(table) / elapsed:,.0f} combinações/s)")
+
+
+async def _bench_notifier(n_signals=200, n_pending=20, timeout=30):
+    runner, base_url, received = await start_stub_telegram()
+    notifier = TelegramNotifier("TOKEN", "-100", base_url=base_url, rate=5, burst=1, coalesce_delay=0.05, backoff=0.01)
+    notifier.start()
+    messages = [f"Sinal de COMPRA para PAR{i}USDT no timeframe 1m:\nPreço atual: 100.5\n" for i in range(n_signals)]
+    # Enfileiradas no mesmo ciclo, todas vão no mesmo agrupamento
+    expected = len(TelegramNotifier.coalesce(messages))
+    try:
+        start = time.perf_counter()
+        for message in messages:
+            notifier.notify(message)
+        enqueue = time.perf_counter() - start
+        await asyncio.wait_for(notifier.queue.join(), timeout)
+        elapsed = time.perf_counter() - start
+        assert len(received) == expected, f"{len(received)} mensagens, esperado {expected}"
+        assert sum(text.count("Sinal de") for text in received) == n_signals
+
+        # Sinais emitidos logo antes da parada ainda devem ser entregues pelo close()
+        for i in range(n_pending):
+            notifier.notify(f"Sinal de VENDA para PAR{i}USDT no timeframe 1h:\nPreço atual: 99.5\n")
+    finally:
+        await asyncio.wait_for(notifier.close(), timeout)
+        await runner.cleanup()
+    assert sum(text.count("Sinal de") for text in received) == n_signals + n_pending
+    assert notifier.failed == 0
+    print(f"Notificações: {n_signals} sinais enfileirados em {enqueue * 1e3:.2f} ms, "
+          f"entregues em {expected} mensagens ({elapsed:.2f}s, 1 resposta 429 repetida); "
+          f"{n_pending} sinais pendentes entregues no encerramento")
+
+
+def bench_notifier():
+    """Enfileiramento sem bloqueio e agrupamento de sinais contra uma Bot API local."""
+    asyncio.run(_bench_notifier())
+
+
+def bench_panel(universe_sizes=(24, 400, 2000), length=50, steps=20):
+    """
+    Lote de um timeframe em regime (uma vela nova por par): estado vetorizado do painel
+    vs. um `StreamingIndicators` por par, ambos seguidos da regra aplicada em bloco.
+    """
+    print(f"Painel vetorizado ({length} velas por par, média de {steps} lotes)")
+    for n_symbols in universe_sizes:
+        rows_by_symbol = {f"PAR{i}USDT": _random_candles(length + steps, seed=i) for i in range(n_symbols)}
+        batches = [{symbol: rows[t:t + length] for symbol, rows in rows_by_symbol.items()}
+                   for t in range(steps + 1)]
+        prices = np.array([rows["close"][length - 1] for rows in rows_by_symbol.values()])
+
+        panel = PanelIndicators()
+        panel.update(batches[0])  # aquecimento: a janela inteira entra no estado
+        start = time.perf_counter()
+        for batch in batches[1:]:
+            _, indicators = panel.update(batch)
+            evaluate_indicators(indicators, prices)
+        vectorized = (time.perf_counter() - start) / steps
+
+        engine = IndicatorEngine()
+        for symbol, rows in batches[0].items():
+            engine.update(symbol, "1h", rows)
+        start = time.perf_counter()
+        for batch in batches[1:]:
+            per_pair = [engine.update(symbol, "1h", rows) for symbol, rows in batch.items()]
+            evaluate_indicators({name: np.array([values[name] for values in per_pair]) for name in per_pair[0]},
+                                prices)
+        per_symbol = (time.perf_counter() - start) / steps
+        print(f"  {n_symbols:>5} pares  painel={vectorized * 1e3:8.2f} ms  por par={per_symbol * 1e3:8.2f} ms  "
+              f"({per_symbol / vectorized:.0f}x)")
+
+
+async def _bench_history(days, latency, concurrency, weight_limit, weight_window):
+    runner, base_url = await start_stub_binance(latency, weight_limit=weight_limit, weight_window=weight_window)
+    end = 1_700_000_000_000 // INTERVAL_MS["1m"] * INTERVAL_MS["1m"]
+    start = end - days * INTERVAL_MS["1d"]
+    budget = WeightBudget(limit=weight_limit, window=weight_window)
+    try:
+        async with BinanceAsyncClient(base_url=base_url, max_concurrency=concurrency, weight_budget=budget) as client:
+            began = time.perf_counter()
+            rows = await fetch_klines_range(client, "PAR0USDT", "1m", start, end)
+            elapsed = time.perf_counter() - began
+    finally:
+        await runner.cleanup()
+    stats = runner.app["stats"]
+    pages = len(page_ranges(start, end, "1m"))
+    expected = (end - start) // INTERVAL_MS["1m"] + 1
+    assert len(rows) == expected and np.all(np.diff(rows["open_time"]) == INTERVAL_MS["1m"])
+    print(f"Histórico 1m de {days} dias: {len(rows):,} velas em {pages} páginas, sem duplicatas")
+    print(f"  paginador: {elapsed:6.2f}s  requisições={stats['requests']}  HTTP 429={stats['rejected']}  "
+          f"peso máximo na janela={stats['max_used']}/{weight_limit} (janela de {weight_window}s)")
+    print(f"  laço antigo (sequencial, sleep de 1s por página), estimado: {pages * (latency + 1):6.0f}s")
+
+
+def bench_history(days=365, latency=0.05, concurrency=20, weight_limit=200, weight_window=1):
+    """Download paginado em paralelo com orçamento de peso, contra um stub com limite de peso."""
+    asyncio.run(_bench_history(days, latency, concurrency, weight_limit, weight_window))
+
+
+def _frame_decode(payload):
+    """Conversão antiga: DataFrame de 12 colunas object e astype/to_datetime coluna a coluna."""
+    df = pd.DataFrame(json.loads(payload), columns=[
+        'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+        'quote_asset_volume', 'number_of_trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
+    ])
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
+    return df
+
+
+def bench_decode(sizes=(2, 50, 1000), repeat=200):
+    """Decodificação de /api/v3/klines: DataFrame + astype vs. listas do json vs. decodificador direto."""
+    print("Decodificação de klines (µs por resposta)")
+    for n in sizes:
+        rows = _random_candles(n, seed=n)
+        klines = [[int(r["open_time"]), *(f"{r[name]:.8f}" for name in ("open", "high", "low", "close", "volume")),
+                   int(r["close_time"]), "1000.0", 10, "5.0", "500.0", "0"] for r in rows]
+        payload = _compact_json(klines).encode()
+        decoded = decode_klines(payload)
+        assert np.array_equal(decoded, klines_to_array(json.loads(payload)))
+        timings = {}
+        for label, decode in (("DataFrame+astype", _frame_decode),
+                              ("json+listas", lambda p: klines_to_array(json.loads(p))),
+                              ("direto", decode_klines)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                decode(payload)
+            timings[label] = (time.perf_counter() - start) / repeat * 1e6
+        speedup = timings["DataFrame+astype"] / timings["direto"]
+        print(f"  {n:>5} velas  " + "  ".join(f"{label}={t:8.1f}" for label, t in timings.items())
+              + f"  ({speedup:.1f}x)")
+
+
+def bench_parity(n=20_000, window=50, n_pairs=4):
+    """
+    Paridade de sinais nas mesmas velas: modo streaming (monitor, janela de `window` velas
+    por consulta) vs. modo em lote (backtest) vs. painel (estado vetorizado de vários pares).
+    Falha se algum sinal divergir.
+    """
+    rows_by_symbol = {f"PAR{i}USDT": _random_candles(n, seed=7 + i, spike_rate=0.05) for i in range(n_pairs)}
+    rows = rows_by_symbol["PAR0USDT"]
+    indicators = batch_indicators(rows["high"], rows["low"], rows["close"], rows["volume"])
+    # Painel: indicadores de cada vela (tempo x pares) com as mesmas janelas do monitor
+    panel = PanelIndicators()
+    series = {}
+    for i in range(n):
+        symbols, values = panel.update({symbol: pair[max(0, i - window + 1):i + 1]
+                                        for symbol, pair in rows_by_symbol.items()})
+        for name, value in values.items():
+            series.setdefault(name, []).append(value)
+    series = {name: np.array(values) for name, values in series.items()}
+    closes = np.stack([rows_by_symbol[symbol]["close"] for symbol in symbols], axis=1)
+    print(f"Paridade streaming vs. lote vs. painel ({n} velas, painel com {n_pairs} pares)")
+    for label, rule in (("regra padrão", {}), ("sem filtro de volume", {"volume_factor": 0})):
+        expected = signal_labels(*signal_masks(rows["close"], indicators, **rule))
+        state = StreamingIndicators()
+        live = np.array([
+            evaluate_signal(rows["close"][i], state.update(rows[max(0, i - window + 1):i + 1]), **rule)
+            for i in range(n)
+        ], dtype=object)
+        mismatches = int(np.sum(live != expected))
+        # Painel: cada coluna comparada ao lote do próprio par (a primeira também ao streaming)
+        panel_signals = signal_labels(*signal_masks(closes, series, **rule))
+        panel_mismatches = int(np.sum(panel_signals[:, 0] != live))
+        for j, symbol in enumerate(symbols):
+            pair = rows_by_symbol[symbol]
+            pair_indicators = batch_indicators(pair["high"], pair["low"], pair["close"], pair["volume"])
+            panel_mismatches += int(np.sum(panel_signals[:, j] != signal_labels(*signal_masks(pair["close"],
+                                                                                                pair_indicators, **rule))))
+        signals = int(np.sum(expected != None))  # noqa: E711 (comparação elemento a elemento)
+        print(f"  {label:<22} sinais={signals:>5}  divergências={mismatches}  divergências do painel={panel_mismatches}")
+        assert mismatches == 0 and panel_mismatches == 0
+
+
+def bench_metrics(n=100_000):
+    """Custo da instrumentação: uma medição de etapa e a exportação com 24 pares x 6 timeframes."""
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.timer("indicators"):
+            pass
+    per_timer = (time.perf_counter() - start) / n
+    for i in range(24):
+        for timeframe in TIMEFRAMES:
+            metrics.mark_evaluated(f"PAR{i}USDT", timeframe, 1_700_000_000_000)
+            metrics.inc("http_requests_total", endpoint="/api/v3/klines", status=200)
+    start = time.perf_counter()
+    text = metrics.render()
+    render = time.perf_counter() - start
+    print(f"Métricas: {per_timer * 1e6:.2f} µs por medição; /metrics com {len(text.splitlines())} linhas "
+          f"em {render * 1e3:.2f} ms")
+
+
+def bench_replay(n_symbols=24, minutes=3 * 24 * 60, timeframes=("1m", "5m", "1h")):
+    """Pipeline do monitor sobre histórico sintético, com relógio virtual e stubs em memória."""
+    symbols = [f"PAR{i}USDT" for i in range(n_symbols)]
+    with tempfile.TemporaryDirectory() as root:
+        store = OHLCVStore(root)
+        for i, symbol in enumerate(symbols):
+            for timeframe in timeframes:
+                step = INTERVAL_MS[timeframe]
+                store.save(symbol, timeframe, _random_candles(minutes * 60_000 // step, seed=i, step=step,
+                                                              spike_rate=0.05))
+        signals = {}
+        for vectorized in (False, True):
+            first = replay(symbols, list(timeframes), store=store, vectorized=vectorized)
+            second = replay(symbols, list(timeframes), store=store, vectorized=vectorized)
+            assert first["alerts"] == second["alerts"], "replay não determinístico"
+            # Cada sinal emitido foi entregue em alguma mensagem enviada à Bot API
+            assert sum(text.count("Sinal de") for _, text in first["alerts"]) == len(first["signals"])
+            mode = "painel" if vectorized else "por par"
+            signals[mode] = first["signals"]
+            print(f"Replay ({mode}): {first['bars']:,} velas em {first['elapsed']:.2f}s "
+                  f"({first['bars_per_second']:,.0f} velas/s, {first['speedup']:,.0f}x o tempo real), "
+                  f"{len(first['signals'])} sinais em {len(first['alerts'])} mensagens, "
+                  f"sequência idêntica em duas execuções")
+        # Os dois modos devem alertar nas mesmas velas (a ordem dentro de um mesmo instante pode mudar)
+        assert sorted(signals["por par"]) == sorted(signals["painel"]), "painel diverge do modo por par"
+        print("  painel e modo por par: mesmos sinais")
+
+
+BENCHMARKS = {
+    "scan": bench_scan,
+    "stream": bench_stream,
+    "indicators": bench_indicators,
+    "backtest": bench_backtest,
+    "runner": bench_runner,
+    "sweep": bench_sweep,
+    "notifier": bench_notifier,
+    "panel": bench_panel,
+    "parity": bench_parity,
+    "decode": bench_decode,
+    "history": bench_history,
+    "metrics": bench_metrics,
+    "replay": bench_replay,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
@@ -0,0 +1,173 @@
+import json
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from market_data import INTERVAL_MS
+
+# Campos das velas usados pela estratégia (índices na resposta de /api/v3/klines)
+KLINE_FIELDS = {
+    "open_time": 0,
+    "open": 1,
+    "high": 2,
+    "low": 3,
+    "close": 4,
+    "volume": 5,
+    "close_time": 6,
+}
+
+KLINE_DTYPE = np.dtype([
+    ("open_time", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+    ("close_time", "i8"),
+])
+
+
+def klines_to_array(klines):
+    """
+    Converte a resposta bruta de klines (listas de strings) em um array estruturado.
+    """
+    rows = np.empty(len(klines), dtype=KLINE_DTYPE)
+    for name, index in KLINE_FIELDS.items():
+        rows[name] = [kline[index] for kline in klines]
+    return rows
+
+
+# Os 7 primeiros campos de cada kline no JSON compacto da Binance:
+# [open_time,"open","high","low","close","volume",close_time,...]
+_KLINE_ROW = re.compile(rb'\[(-?\d+),"([^"]*)","([^"]*)","([^"]*)","([^"]*)","([^"]*)",(-?\d+)')
+
+
+def decode_klines(payload):
+    """
+    Decodifica o corpo bruto (bytes) de /api/v3/klines direto para um array estruturado.
+
+    Só os campos usados pela estratégia são lidos, sem json.loads nem DataFrame; os
+    timestamps passam por float64 sem perda (cabem nos 53 bits da mantissa).
+    """
+    matches = _KLINE_ROW.findall(payload)
+    if not matches:
+        # Resposta vazia ou em formato inesperado (ex.: JSON com espaços): caminho genérico
+        return klines_to_array(json.loads(payload))
+    values = np.array(matches, dtype=np.float64)
+    rows = np.empty(len(values), dtype=KLINE_DTYPE)
+    for index, name in enumerate(KLINE_DTYPE.names):
+        rows[name] = values[:, index]
+    return rows
+
+
+def array_to_frame(rows):
+    df = pd.DataFrame({name: rows[name] for name in KLINE_DTYPE.names})
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    return df
+
+
+class CandleRing:
+    """
+    Buffer circular de tamanho fixo com as velas mais recentes de um par/timeframe.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=KLINE_DTYPE)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_open_time(self):
+        if not self._size:
+            return None
+        return int(self._data["open_time"][(self._start + self._size - 1) % self.capacity])
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def merge(self, rows):
+        """
+        Incorpora velas em ordem cronológica: a vela em formação é atualizada no lugar,
+        as novas são anexadas sobrescrevendo as mais antigas e as já conhecidas são ignoradas.
+        """
+        last_open_time = self.last_open_time
+        if last_open_time is not None:
+            same = rows["open_time"] == last_open_time
+            if same.any():
+                self._data[(self._start + self._size - 1) % self.capacity] = rows[same][-1]
+            rows = rows[rows["open_time"] > last_open_time]
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+        if not len(rows):
+            return
+
+        positions = (self._start + self._size + np.arange(len(rows))) % self.capacity
+        self._data[positions] = rows
+        overflow = max(0, self._size + len(rows) - self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+        self._size = min(self.capacity, self._size + len(rows))
+
+    def to_array(self):
+        """Cópia das velas em ordem cronológica."""
+        end = self._start + self._size
+        if end <= self.capacity:
+            return self._data[self._start:end].copy()
+        return np.concatenate((self._data[self._start:], self._data[:end - self.capacity]))
+
+    def to_frame(self):
+        return array_to_frame(self.to_array())
+
+
+class CandleCache:
+    """
+    Velas em memória por (par, timeframe), atualizadas com buscas incrementais.
+    """
+
+    def __init__(self, capacity=50, clock=time.time):
+        self.capacity = capacity
+        self.clock = clock
+        self._rings = {}
+
+    def items(self):
+        """(par, timeframe, velas) de cada buffer não vazio."""
+        return [(symbol, timeframe, ring.to_array()) for (symbol, timeframe), ring in self._rings.items() if len(ring)]
+
+    def restore(self, symbol, timeframe, rows):
+        self.ring(symbol, timeframe).merge(rows)
+
+    def ring(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self._rings:
+            self._rings[key] = CandleRing(self.capacity)
+        return self._rings[key]
+
+    def request_params(self, symbol, timeframe):
+        """
+        Parâmetros de get_klines para buscar apenas as velas a partir da última em cache.
+        Se a lacuna não couber no buffer, a janela inteira é buscada novamente.
+        """
+        ring = self.ring(symbol, timeframe)
+        last_open_time = ring.last_open_time
+        if last_open_time is None:
+            return {"limit": self.capacity}
+
+        missing = (self.clock() * 1000 - last_open_time) // INTERVAL_MS[timeframe] + 1
+        if missing >= self.capacity:
+            ring.clear()
+            return {"limit": self.capacity}
+        return {"limit": self.capacity, "startTime": last_open_time}
+
+    def merge(self, symbol, timeframe, klines):
+        """`klines` pode ser um array já decodificado ou a lista de listas da API."""
+        if not isinstance(klines, np.ndarray):
+            klines = klines_to_array(klines)
+        ring = self.ring(symbol, timeframe)
+        ring.merge(klines)
+        return ring
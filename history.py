@@ -0,0 +1,50 @@
+"""
+Download do histórico de velas em páginas paralelas, dentro do orçamento de peso da API.
+"""
+import asyncio
+
+import aiohttp
+import numpy as np
+
+from candle_cache import KLINE_DTYPE, decode_klines
+from market_data import INTERVAL_MS
+
+
+def page_ranges(start_time, end_time, interval, limit=1000):
+    """
+    Intervalos [início, fim] (ms, inclusivos) das páginas de klines entre `start_time` e
+    `end_time`. Cada página cobre exatamente `limit` velas a partir de um open_time
+    alinhado ao timeframe, então as páginas não se sobrepõem.
+    """
+    step = INTERVAL_MS[interval]
+    first = -(-int(start_time) // step) * step  # primeiro open_time >= start_time
+    span = limit * step
+    return [(start, min(start + span - 1, int(end_time))) for start in range(first, int(end_time) + 1, span)]
+
+
+async def fetch_klines_range(client, symbol, interval, start_time, end_time, limit=1000, retries=3):
+    """
+    Baixa em paralelo todas as velas com open_time entre `start_time` e `end_time`.
+
+    As páginas são calculadas de antemão (`page_ranges`) e buscadas de uma vez; o ritmo
+    fica por conta do semáforo e do orçamento de peso do cliente. Respostas 418/429 são
+    repetidas após o Retry-After. Retorna um array estruturado ordenado e sem duplicatas.
+    """
+    async def fetch_page(start, end):
+        for attempt in range(retries + 1):
+            try:
+                payload = await client.get_klines_payload(symbol, interval, limit=limit, startTime=start, endTime=end)
+                return decode_klines(payload)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in (418, 429) or attempt == retries:
+                    raise
+                if client.weight_budget is None:
+                    await asyncio.sleep(float((e.headers or {}).get("Retry-After", 1)))
+
+    ranges = page_ranges(start_time, end_time, interval, limit)
+    pages = await asyncio.gather(*(fetch_page(start, end) for start, end in ranges))
+    rows = np.concatenate(pages) if pages else np.empty(0, dtype=KLINE_DTYPE)
+    # As páginas já vêm em ordem e sem sobreposição; o filtro só protege contra respostas fora do intervalo
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = np.diff(rows["open_time"]) > 0
+    return rows[keep]
@@ -0,0 +1,242 @@
+import asyncio
+import threading
+import time
+import aiohttp
+
+BINANCE_API_URL = "https://api.binance.com"
+
+# Limite de peso de requisições por minuto (por IP) da API spot e peso de cada endpoint usado
+REQUEST_WEIGHT_LIMIT = 6000
+KLINES_WEIGHT = 2
+
+# Duração de cada timeframe em milissegundos
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+
+class AsyncHttpClient:
+    """
+    Cliente HTTP assíncrono com uma única sessão keep-alive e concorrência limitada.
+    """
+
+    def __init__(self, base_url="", max_concurrency=10, timeout=10, headers=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = headers or {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+
+    def _get_session(self):
+        # A sessão é criada sob demanda para ficar ligada ao loop em execução
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, headers=self.headers
+            )
+        return self._session
+
+    def on_response(self, response):
+        """Chamado a cada resposta, antes da verificação de status (ex.: para ler cabeçalhos)."""
+
+    async def _get(self, path, params, read):
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.get(f"{self.base_url}{path}", params=params) as response:
+                self.on_response(response)
+                response.raise_for_status()
+                return await read(response)
+
+    async def get_json(self, path, params=None):
+        return await self._get(path, params, lambda response: response.json())
+
+    async def get_bytes(self, path, params=None):
+        """Corpo bruto da resposta, para decodificadores que dispensam o json.loads."""
+        return await self._get(path, params, lambda response: response.read())
+
+    async def post_json(self, path, payload):
+        session = self._get_session()
+        async with self._semaphore:
+            async with session.post(f"{self.base_url}{path}", json=payload) as response:
+                response.raise_for_status()
+                return await response.json()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class WeightBudget:
+    """
+    Orçamento de peso de requisições por janela de tempo (1 minuto na Binance).
+
+    O consumo é estimado localmente e corrigido pelo cabeçalho X-MBX-USED-WEIGHT-1M de
+    cada resposta, que também inclui o peso gasto por outros processos no mesmo IP.
+    Quando o orçamento acaba, `acquire` espera a virada da janela em vez de pausas fixas.
+    O estado é protegido por lock, então um orçamento pode ser compartilhado entre threads.
+    """
+
+    def __init__(self, limit=REQUEST_WEIGHT_LIMIT, headroom=0.8, window=60, clock=time.time, sleep=asyncio.sleep):
+        self.limit = int(limit * headroom)
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self.used = 0
+        self.in_flight = 0
+        self.max_used = 0
+        self.blocked_until = 0.0
+        self._window_index = None
+        self._lock = threading.Lock()
+
+    def _roll(self, now):
+        index = int(now // self.window)
+        if index != self._window_index:
+            self._window_index = index
+            # Requisições ainda em andamento podem ser contadas pelo servidor na nova janela
+            self.used = self.in_flight
+
+    async def acquire(self, weight):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._roll(now)
+                if now >= self.blocked_until and self.used + weight <= self.limit:
+                    self.used += weight
+                    self.in_flight += weight
+                    return
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    wait = (self._window_index + 1) * self.window - now
+            await self.sleep(wait)
+
+    def release(self, weight):
+        """Marca como concluída uma requisição liberada por `acquire`."""
+        with self._lock:
+            self.in_flight -= weight
+
+    def update(self, used_weight):
+        """Peso já usado na janela atual, segundo o servidor."""
+        with self._lock:
+            self._roll(self.clock())
+            self.used = max(self.used, used_weight)
+            self.max_used = max(self.max_used, used_weight)
+
+    def block(self, seconds):
+        """Suspende as requisições (ex.: após um HTTP 429 com Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class BinanceAsyncClient(AsyncHttpClient):
+    """
+    Endpoints públicos de mercado da Binance usados pelo monitor.
+
+    Com `weight_budget`, cada requisição de klines espera o orçamento de peso e as
+    respostas atualizam o orçamento a partir dos cabeçalhos da Binance. Com `metrics`,
+    as respostas são contadas por endpoint e status.
+    """
+
+    def __init__(self, api_key=None, base_url=BINANCE_API_URL, max_concurrency=10, timeout=10, weight_budget=None,
+                 metrics=None):
+        headers = {"X-MBX-APIKEY": api_key} if api_key else None
+        super().__init__(base_url, max_concurrency=max_concurrency, timeout=timeout, headers=headers)
+        self.weight_budget = weight_budget
+        self.metrics = metrics
+        self.used_weight = None
+
+    def on_response(self, response):
+        if self.metrics is not None:
+            self.metrics.inc("http_requests_total", endpoint=response.url.path, status=response.status)
+        used_weight = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used_weight is not None:
+            self.used_weight = int(used_weight)
+            if self.weight_budget is not None:
+                self.weight_budget.update(self.used_weight)
+        if response.status in (418, 429) and self.weight_budget is not None:
+            self.weight_budget.block(float(response.headers.get("Retry-After", 60)))
+
+    @staticmethod
+    def _klines_params(symbol, interval, limit, startTime, endTime):
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if startTime is not None:
+            params["startTime"] = int(startTime)
+        if endTime is not None:
+            params["endTime"] = int(endTime)
+        return params
+
+    async def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        return await self.get_json("/api/v3/klines", self._klines_params(symbol, interval, limit, startTime, endTime))
+
+    async def get_klines_payload(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        """Resposta bruta de /api/v3/klines (bytes), para `candle_cache.decode_klines`."""
+        params = self._klines_params(symbol, interval, limit, startTime, endTime)
+        if self.weight_budget is None:
+            return await self.get_bytes("/api/v3/klines", params)
+        await self.weight_budget.acquire(KLINES_WEIGHT)
+        try:
+            return await self.get_bytes("/api/v3/klines", params)
+        finally:
+            self.weight_budget.release(KLINES_WEIGHT)
+
+    async def get_time_offset(self):
+        """
+        Diferença em ms entre o relógio do servidor e o local, descontando metade da latência.
+        """
+        sent_at = time.time() * 1000
+        server_time = (await self.get_json("/api/v3/time"))["serverTime"]
+        received_at = time.time() * 1000
+        return int(server_time - (sent_at + received_at) / 2)
+
+    async def get_symbol_ticker(self, symbol=None):
+        """
+        Sem `symbol`, retorna a lista de preços de todos os pares em uma única requisição.
+        """
+        params = {"symbol": symbol} if symbol else None
+        return await self.get_json("/api/v3/ticker/price", params)
+
+
+class PriceSnapshot:
+    """
+    Preços de todos os pares obtidos em uma única requisição e compartilhados entre as tarefas.
+
+    O snapshot é renovado quando fica mais antigo que `max_age` segundos; tarefas que
+    pedem preço ao mesmo tempo aguardam uma única atualização.
+    """
+
+    def __init__(self, client, max_age=10.0, clock=time.monotonic):
+        self.client = client
+        self.max_age = max_age
+        self.clock = clock
+        self.prices = {}
+        self.updated_at = None
+        self._lock = asyncio.Lock()
+
+    def is_stale(self):
+        return self.updated_at is None or self.clock() - self.updated_at > self.max_age
+
+    async def refresh(self):
+        tickers = await self.client.get_symbol_ticker()
+        self.prices = {ticker["symbol"]: float(ticker["price"]) for ticker in tickers}
+        self.updated_at = self.clock()
+
+    async def get_price(self, symbol):
+        if self.is_stale():
+            async with self._lock:
+                # Outra tarefa pode ter atualizado o snapshot enquanto esperávamos o lock
+                if self.is_stale():
+                    await self.refresh()
+        return self.prices[symbol]
+
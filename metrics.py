@@ -0,0 +1,186 @@
+"""
+Métricas do pipeline do monitor: latência por etapa, contadores e atraso por par/timeframe.
+
+Tudo fica em memória no processo do monitor, com custo de alguns microssegundos por
+medição. `render` gera o formato texto do Prometheus (endpoint /metrics) e `snapshot`
+um resumo em dicionário, gravado no SignalStore para o painel de diagnóstico do Streamlit.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+
+from market_data import INTERVAL_MS
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Etapas do pipeline medidas pelo monitor
+STAGES = ("fetch", "parse", "indicators", "evaluation", "notify")
+
+
+class Histogram:
+    """Histograma de buckets fixos (contagens não cumulativas, acumuladas só na exportação)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # o último é o +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimativa do quantil `q` por interpolação linear dentro do bucket."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= target:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (target - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+
+class Metrics:
+    """
+    Registro de métricas do monitor.
+
+    `collectors` são funções chamadas na exportação que retornam {nome: valor} para
+    gauges lidos de outros objetos (ex.: peso da API informado pela Binance).
+    """
+
+    def __init__(self, prefix="monitor", clock=time.time):
+        self.prefix = prefix
+        self.clock = clock
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.counters = {}
+        self.gauges = {}
+        self.evaluated = {}  # (par, timeframe) -> (open_time da vela avaliada, momento da avaliação)
+        self.collectors = []
+        self.started_at = clock()
+
+    def observe(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        self.gauges[(name, _labels(labels))] = value
+
+    def mark_evaluated(self, symbol, timeframe, open_time):
+        self.evaluated[symbol, timeframe] = (int(open_time), self.clock())
+
+    def staleness(self):
+        """
+        Por (par, timeframe): segundos desde a última avaliação e atraso da vela avaliada
+        em relação ao agora (fechamento da vela até o momento atual).
+        """
+        now = self.clock()
+        result = {}
+        for (symbol, timeframe), (open_time, evaluated_at) in self.evaluated.items():
+            close_time = (open_time + INTERVAL_MS[timeframe]) / 1000
+            result[symbol, timeframe] = {
+                "since_evaluation": now - evaluated_at,
+                "candle_lag": max(0.0, now - close_time),
+            }
+        return result
+
+    def _collected(self):
+        gauges = dict(self.gauges)
+        for collector in self.collectors:
+            for name, value in collector().items():
+                if value is not None:
+                    gauges[(name, ())] = value
+        return gauges
+
+    def render(self):
+        """Métricas no formato texto de exposição do Prometheus."""
+        p = self.prefix
+        lines = [f"# TYPE {p}_stage_seconds histogram"]
+        for stage, hist in self.stages.items():
+            cumulative = 0
+            for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                cumulative += count
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {hist.sum}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {hist.count}')
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f"# TYPE {p}_{name} counter")
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    lines.append(f"{p}_{name}{_format_labels(labels)} {value}")
+
+        gauges = self._collected()
+        for name in sorted({name for name, _ in gauges}):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            for (gauge, labels), value in sorted(gauges.items()):
+                if gauge == name:
+                    lines.append(f"{p}_{name}{_format_labels(labels)} {value}")
+
+        staleness = self.staleness()
+        for metric, field in (("seconds_since_evaluation", "since_evaluation"), ("candle_lag_seconds", "candle_lag")):
+            lines.append(f"# TYPE {p}_{metric} gauge")
+            for (symbol, timeframe), values in sorted(staleness.items()):
+                lines.append(f'{p}_{metric}{{symbol="{symbol}",timeframe="{timeframe}"}} {values[field]:.3f}')
+
+        lines.append(f"# TYPE {p}_uptime_seconds gauge")
+        lines.append(f"{p}_uptime_seconds {self.clock() - self.started_at:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Resumo serializável em JSON para o painel de diagnóstico."""
+        return {
+            "stages": {
+                stage: {
+                    "count": hist.count,
+                    "mean_ms": hist.sum / hist.count * 1000 if hist.count else None,
+                    "p50_ms": hist.quantile(0.5) * 1000 if hist.count else None,
+                    "p95_ms": hist.quantile(0.95) * 1000 if hist.count else None,
+                    "max_ms": hist.max * 1000 if hist.count else None,
+                }
+                for stage, hist in self.stages.items()
+            },
+            "counters": [
+                {"name": name, **dict(labels), "value": value} for (name, labels), value in sorted(self.counters.items())
+            ],
+            "gauges": {name: value for (name, labels), value in self._collected().items() if not labels},
+            "staleness": [
+                {"symbol": symbol, "timeframe": timeframe,
+                 "since_evaluation_s": round(values["since_evaluation"], 1),
+                 "candle_lag_s": round(values["candle_lag"], 1)}
+                for (symbol, timeframe), values in sorted(self.staleness().items())
+            ],
+        }
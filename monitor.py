@@ -0,0 +1,396 @@
+"""
+Monitor de sinais em um processo próprio, independente do Streamlit.
+
+O processo busca os dados, avalia as condições e envia as notificações uma única vez,
+gravando sinais e eventos no SignalStore; as sessões do Streamlit apenas leem o banco.
+
+Uso: python monitor.py --symbols BTCUSDT ETHUSDT --timeframes 1m 1h [--telegram] [--mode websocket]
+                      [--metrics-port 9108] [--metrics-host 127.0.0.1]
+
+Com --metrics-port, as métricas do pipeline ficam disponíveis em http://localhost:<porta>/metrics
+(formato Prometheus); um resumo também é gravado no banco para o painel de diagnóstico.
+O endpoint não tem autenticação e por padrão só aceita conexões locais; use --metrics-host
+para expô-lo em outra interface.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from aiohttp import web
+from dotenv import load_dotenv
+
+from candle_cache import CandleCache, decode_klines
+from market_data import BinanceAsyncClient, PriceSnapshot
+from metrics import Metrics
+from notifier import TelegramNotifier
+from panel import PanelEngine, changed_signals, evaluate_indicators
+from scheduler import CandleScheduler
+from signal_store import SignalStore
+from strategy import TIMEFRAMES, IndicatorEngine, evaluate_signal
+from streaming import KlineStream
+
+# Carregar variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Importando credenciais
+api_key_spot = os.getenv("api_key_spot")
+telegram_bot_token = os.getenv("telegram_bot_token")
+telegram_chat_id = os.getenv("telegram_chat_id")
+
+# Limite de requisições simultâneas por sessão HTTP
+MAX_CONCURRENT_REQUESTS = 10
+
+# Idade máxima (em segundos) do snapshot de preços compartilhado entre os pares
+PRICE_MAX_AGE = 10
+
+# Intervalo (em segundos) entre as atualizações do heartbeat lido pela interface
+HEARTBEAT_INTERVAL = 10
+
+# Endereço do endpoint /metrics (sem autenticação): só a máquina local, a menos que --metrics-host diga outro
+METRICS_HOST = "127.0.0.1"
+
+# Tempo (em segundos) que um monitor recém-lançado espera pela trava de processo único; cobre
+# o encerramento de um monitor anterior que já gravou a parada mas ainda não saiu
+LOCK_TIMEOUT = 5
+
+
+class Monitor:
+    """
+    Pipeline de coleta, avaliação e notificação para um conjunto de pares e timeframes.
+    """
+
+    def __init__(self, symbols, timeframes, signal_choice="Ambos", notify_telegram=False,
+                 streaming=False, vectorized=False, store=None, client=None, notifier=None,
+                 clock=time.time, sleep=asyncio.sleep, metrics=None, metrics_port=None, metrics_host=METRICS_HOST):
+        self.symbols = symbols
+        self.timeframes = timeframes
+        self.signal_choice = signal_choice
+        self.notify_telegram = notify_telegram
+        self.streaming = streaming
+        self.vectorized = vectorized
+        self.clock = clock
+        self.sleep = sleep
+        self.store = store or SignalStore()
+        # Latência por etapa, contadores e atraso por par/timeframe
+        self.metrics = metrics or Metrics(clock=clock)
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+
+        # Cliente HTTP assíncrono (sessão keep-alive compartilhada por todas as tarefas)
+        self.client = client or BinanceAsyncClient(api_key_spot, max_concurrency=MAX_CONCURRENT_REQUESTS,
+                                                   metrics=self.metrics)
+        # Envio ao Telegram em segundo plano, com limite de taxa e mensagens agrupadas por ciclo
+        self.notifier = notifier or TelegramNotifier(
+            telegram_bot_token, telegram_chat_id,
+            on_error=lambda e: self.report("error", f"Erro ao enviar mensagem para o Telegram: {e}"),
+            metrics=self.metrics,
+        )
+        self.metrics.collectors.append(lambda: {
+            "api_used_weight": getattr(self.client, "used_weight", None),
+            "telegram_queue_size": self.notifier.queue.qsize(),
+        })
+        self.price_snapshot = PriceSnapshot(self.client, max_age=PRICE_MAX_AGE, clock=clock)
+        # Últimas 50 velas por par/timeframe, atualizadas apenas com as velas novas
+        self.candle_cache = CandleCache(capacity=50, clock=clock)
+        # Estado incremental dos indicadores por par/timeframe (ou por timeframe, em arrays, no modo vetorizado)
+        self.indicator_engine = IndicatorEngine()
+        self.panel_engine = PanelEngine()
+        # Controle de notificações para evitar repetições (retomado do SignalStore ao iniciar)
+        self.last_notifications = {}
+
+    @property
+    def config(self):
+        return {
+            "symbols": self.symbols,
+            "timeframes": self.timeframes,
+            "signal_choice": self.signal_choice,
+            "notify_telegram": self.notify_telegram,
+            "streaming": self.streaming,
+            "vectorized": self.vectorized,
+        }
+
+    def report(self, level, message):
+        print(message, file=sys.stderr if level == "error" else sys.stdout)
+        self.store.add_event(level, message)
+
+    async def fetch_ticker_and_candles(self, symbol, timeframe):
+        try:
+            params = self.candle_cache.request_params(symbol, timeframe)
+            with self.metrics.timer("fetch"):
+                payload, current_price = await asyncio.gather(
+                    self.client.get_klines_payload(symbol, timeframe, **params),
+                    self.price_snapshot.get_price(symbol),
+                )
+            # Resposta bruta decodificada direto para o array de velas, sem DataFrame
+            with self.metrics.timer("parse"):
+                rows = self.candle_cache.merge(symbol, timeframe, decode_klines(payload)).to_array()
+
+            return current_price, rows
+        except Exception as e:
+            self.metrics.inc("fetch_errors_total")
+            self.report("error", f"Erro ao obter dados de {symbol} no timeframe {timeframe}: {e}")
+            return None, None
+
+    def report_no_candles(self, symbol, timeframe):
+        self.metrics.inc("fetch_errors_total")
+        self.report("error", f"Erro ao obter dados de {symbol} no timeframe {timeframe}: nenhuma vela fechada")
+
+    def evaluate_conditions(self, symbol, timeframe, current_price, rows):
+        """Avalia as condições de um par em um timeframe e notifica sinais novos."""
+        if not len(rows):
+            # Ex.: klines vazio para um par recém-listado; os demais pares seguem normalmente
+            self.report_no_candles(symbol, timeframe)
+            return
+        # Indicadores (atualizados de forma incremental, só com as velas novas)
+        with self.metrics.timer("indicators"):
+            indicators = self.indicator_engine.update(symbol, timeframe, rows)
+        with self.metrics.timer("evaluation"):
+            current_signal = evaluate_signal(current_price, indicators, self.signal_choice)
+        self.metrics.mark_evaluated(symbol, timeframe, rows['open_time'][-1])
+        self.emit_signal(symbol, timeframe, current_signal, current_price, rows['open_time'][-1])
+
+    def emit_signal(self, symbol, timeframe, current_signal, current_price, candle_time=None):
+        # Evitar notificações repetidas
+        key = f"{symbol}_{timeframe}"
+        last_signal = self.last_notifications.get(key)
+
+        if current_signal and current_signal != last_signal:
+            message = (
+                f"Sinal de {current_signal} para {symbol} no timeframe {timeframe}:\n"
+                f"Preço atual: {current_price}\n"
+            )
+            print(message)
+            self.metrics.inc("signals_total", signal=current_signal)
+            self.store.add_signal(symbol, timeframe, current_signal, current_price, message, candle_time)
+            if self.notify_telegram:
+                self.notifier.notify(message)
+            self.last_notifications[key] = current_signal
+
+    async def check_timeframe(self, symbol, timeframe, close_time):
+        current_price, rows = await self.fetch_ticker_and_candles(symbol, timeframe)
+        if rows is None:
+            return
+        # Avalia a vela que acabou de fechar, e não a que acabou de abrir
+        rows = rows[rows['open_time'] < close_time]
+        self.evaluate_conditions(symbol, timeframe, current_price, rows)
+
+    async def check_panel(self, timeframe, close_time, symbols):
+        """Avalia todos os pares de um timeframe de uma vez: indicadores e regra em bloco (NumPy)."""
+        fetched = await asyncio.gather(*(self.fetch_ticker_and_candles(symbol, timeframe) for symbol in symbols))
+        rows_by_symbol = {}
+        prices = {}
+        for symbol, (current_price, rows) in zip(symbols, fetched):
+            if rows is None:
+                continue
+            rows = rows[rows['open_time'] < close_time]
+            if not len(rows):
+                self.report_no_candles(symbol, timeframe)
+                continue
+            rows_by_symbol[symbol] = rows
+            prices[symbol] = current_price
+
+        if not rows_by_symbol:
+            return
+        with self.metrics.timer("indicators"):
+            panel_symbols, indicators = self.panel_engine.update(timeframe, rows_by_symbol)
+        with self.metrics.timer("evaluation"):
+            signals = evaluate_indicators(indicators, np.array([prices[symbol] for symbol in panel_symbols]),
+                                          self.signal_choice)
+        for symbol in panel_symbols:
+            self.metrics.mark_evaluated(symbol, timeframe, rows_by_symbol[symbol]['open_time'][-1])
+        previous = [self.last_notifications.get(f"{symbol}_{timeframe}") for symbol in panel_symbols]
+        for symbol, current_signal in changed_signals(panel_symbols, signals, previous):
+            self.emit_signal(symbol, timeframe, current_signal, prices[symbol],
+                             rows_by_symbol[symbol]['open_time'][-1])
+
+    async def notify_conditions(self):
+        """Envia notificações com controle de repetição, logo após o fechamento de cada vela."""
+        try:
+            offset_ms = await self.client.get_time_offset()
+        except Exception as e:
+            self.report("error", f"Erro ao sincronizar o tempo: {e}")
+            offset_ms = 0
+
+        keys = [(symbol, timeframe) for symbol in self.symbols for timeframe in self.timeframes]
+        scheduler = CandleScheduler(keys, offset_ms=offset_ms, clock=self.clock, sleep=self.sleep)
+        while True:
+            # Todos os pares/timeframes que fecharam no mesmo instante são consultados juntos
+            batch = await scheduler.next_batch()
+            if self.vectorized:
+                groups = {}
+                for symbol, timeframe, close_time in batch:
+                    groups.setdefault((timeframe, close_time), []).append(symbol)
+                await asyncio.gather(*(self.check_panel(timeframe, close_time, group)
+                                       for (timeframe, close_time), group in groups.items()))
+            else:
+                await asyncio.gather(*(self.check_timeframe(symbol, timeframe, close_time)
+                                       for symbol, timeframe, close_time in batch))
+
+    async def stream_conditions(self):
+        """Avalia as condições a cada vela recebida pelo WebSocket (atualizada ou fechada)."""
+        async def on_candle(symbol, timeframe, ring, closed):
+            rows = ring.to_array()
+            self.evaluate_conditions(symbol, timeframe, rows['close'][-1], rows)
+
+        def on_backfill_error(symbol, timeframe, e):
+            self.metrics.inc("fetch_errors_total")
+            self.report("error", f"Erro ao obter dados de {symbol} no timeframe {timeframe}: {e}")
+
+        stream = KlineStream(self.client, self.candle_cache, self.symbols, self.timeframes, on_candle,
+                             on_error=lambda e: self.report("error", f"Conexão WebSocket interrompida: {e}"),
+                             on_backfill_error=on_backfill_error)
+        await stream.run()
+
+    def restore_state(self):
+        """
+        Retoma o estado gravado pela execução anterior: últimos sinais (para não repetir
+        alertas já enviados) e velas em cache, que também aquecem os indicadores.
+        """
+        self.last_notifications.update(self.store.last_signals())
+        keys = {(symbol, timeframe) for symbol in self.symbols for timeframe in self.timeframes}
+        restored = 0
+        panels = {}
+        for symbol, timeframe, rows in self.store.load_candles():
+            if (symbol, timeframe) in keys and len(rows):
+                self.candle_cache.restore(symbol, timeframe, rows)
+                if self.vectorized and not self.streaming:
+                    panels.setdefault(timeframe, {})[symbol] = rows
+                else:
+                    self.indicator_engine.update(symbol, timeframe, rows)
+                restored += 1
+        for timeframe, rows_by_symbol in panels.items():
+            self.panel_engine.update(timeframe, rows_by_symbol)
+        return restored
+
+    def save_state(self):
+        self.store.save_candles(self.candle_cache.items())
+
+    async def heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        """Mantém o heartbeat atualizado e retorna quando a interface pede a parada."""
+        while True:
+            await self.sleep(interval)
+            self.store.set_status(heartbeat=self.clock(), metrics=self.metrics.snapshot())
+            self.save_state()
+            if self.store.get_status().get("stop_requested"):
+                self.report("info", "Parada solicitada pela interface.")
+                return
+
+    async def start_metrics_server(self):
+        """Servidor HTTP com o endpoint /metrics no formato texto do Prometheus."""
+        async def handle(request):
+            return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8",
+                                headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self.metrics_host, self.metrics_port).start()
+        return runner
+
+    async def run(self):
+        metrics_runner = await self.start_metrics_server() if self.metrics_port else None
+        # `stop_requested` não é tocado aqui: uma parada pedida durante a inicialização continua valendo
+        self.store.set_status(config=self.config, started_at=self.clock(), heartbeat=self.clock(),
+                              starting_at=None)
+        restored = self.restore_state()
+        self.report("info", f"Monitor iniciado: {len(self.symbols)} pares, timeframes {', '.join(self.timeframes)} "
+                            f"({restored} séries de velas restauradas).")
+        self.notifier.start()
+        pipeline = asyncio.ensure_future(self.stream_conditions() if self.streaming else self.notify_conditions())
+        heartbeat = asyncio.ensure_future(self.heartbeat())
+        try:
+            done, _ = await asyncio.wait({pipeline, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()  # Propaga erros inesperados do pipeline
+        finally:
+            for task in (pipeline, heartbeat):
+                task.cancel()
+            await asyncio.gather(pipeline, heartbeat, return_exceptions=True)
+            await self.client.close()
+            await self.notifier.close()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            self.save_state()
+            self.store.set_status(heartbeat=None, stop_requested=False, metrics=self.metrics.snapshot())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Monitor de sinais de compra e venda (processo único).")
+    parser.add_argument("--symbols", nargs="+", required=True, help="pares a monitorar, ex.: BTCUSDT ETHUSDT")
+    parser.add_argument("--timeframes", nargs="+", required=True, choices=TIMEFRAMES)
+    parser.add_argument("--signals", default="Ambos", choices=["Compra", "Venda", "Ambos"])
+    parser.add_argument("--telegram", action="store_true", help="envia os sinais para o Telegram")
+    parser.add_argument("--mode", default="rest", choices=["rest", "websocket"], help="modo de coleta de dados")
+    parser.add_argument("--vectorized", action="store_true", help="avalia todos os pares de uma vez (modo REST)")
+    parser.add_argument("--db", default="signals.db", help="banco SQLite compartilhado com a interface")
+    parser.add_argument("--metrics-port", type=int, help="porta do endpoint /metrics (Prometheus); desativado se omitido")
+    parser.add_argument("--metrics-host", default=METRICS_HOST,
+                        help="endereço do endpoint /metrics, que não tem autenticação (ex.: 0.0.0.0 para expor na rede)")
+    return parser.parse_args(argv)
+
+
+def acquire_instance_lock(path, timeout=LOCK_TIMEOUT):
+    """
+    Trava exclusiva no arquivo `path` (ao lado do banco), que garante um único monitor por
+    banco mesmo com lançamentos simultâneos. Retorna o arquivo aberto, com o pid do processo,
+    que mantém a trava até ser fechado ou o processo terminar (inclusive por falha), ou None
+    se outro monitor continuar com a trava por `timeout` segundos.
+    """
+    lock_file = open(path, "a+")
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                lock_file.close()
+                return None
+            time.sleep(0.1)
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    lock = acquire_instance_lock(f"{args.db}.lock")
+    if lock is None:
+        print("Já existe um monitor em execução usando este banco.", file=sys.stderr)
+        return 1
+
+    store = SignalStore(args.db)
+    if not store.is_monitor_starting():
+        # Lançado pela linha de comando: um pedido de parada anterior não vale para este processo
+        store.set_status(stop_requested=False)
+    monitor = Monitor(args.symbols, args.timeframes, signal_choice=args.signals, notify_telegram=args.telegram,
+                      streaming=args.mode == "websocket", vectorized=args.vectorized, store=store,
+                      metrics_port=args.metrics_port, metrics_host=args.metrics_host)
+    try:
+        asyncio.run(monitor.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        lock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
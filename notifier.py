@@ -0,0 +1,157 @@
+import asyncio
+import time
+import aiohttp
+
+from market_data import AsyncHttpClient
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Tempo máximo (em segundos) para entregar as mensagens pendentes ao encerrar
+CLOSE_TIMEOUT = 10
+
+
+class TokenBucket:
+    """
+    Limitador de taxa: até `capacity` envios imediatos, repostos a `rate` por segundo.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await self.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+
+class TelegramNotifier:
+    """
+    Fila de notificações do Telegram com uma tarefa dedicada de envio.
+
+    `notify` apenas enfileira a mensagem e retorna na hora, então a detecção de sinais
+    nunca espera pela entrega. A tarefa de envio junta as mensagens que chegam no mesmo
+    ciclo em uma só, respeita o limite de taxa do chat e repete os envios que falham
+    com espera exponencial.
+    """
+
+    def __init__(self, bot_token, chat_id, base_url=TELEGRAM_API_URL, rate=20 / 60, burst=3,
+                 coalesce_delay=1.0, max_retries=5, backoff=1.0, on_error=None, sleep=asyncio.sleep, metrics=None,
+                 client=None, clock=time.monotonic):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        # `client` permite trocar a Bot API por um stub (precisa de post_json e close)
+        self.client = client or AsyncHttpClient(base_url, max_concurrency=1)
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.coalesce_delay = coalesce_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_error = on_error
+        self.sleep = sleep
+        self.metrics = metrics
+        self.queue = asyncio.Queue()
+        self.sent = 0
+        self.failed = 0
+        self._task = None
+
+    def notify(self, message):
+        self.queue.put_nowait(message)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def close(self, timeout=CLOSE_TIMEOUT):
+        """
+        Entrega as mensagens ainda na fila (ou aguardando o agrupamento) antes de
+        encerrar, por até `timeout` segundos; o que sobrar é contado como falha.
+        """
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pending = self.queue.qsize()
+                self.failed += pending
+                if self.on_error:
+                    self.on_error(RuntimeError(f"{pending} mensagem(ns) não entregue(s) ao encerrar"))
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.client.close()
+
+    @staticmethod
+    def coalesce(messages, max_length=TELEGRAM_MAX_MESSAGE_LENGTH):
+        """Junta as mensagens em blocos que respeitam o tamanho máximo do Telegram."""
+        batches = []
+        current = ""
+        for message in messages:
+            message = message.strip()[:max_length]
+            if current and len(current) + 2 + len(message) > max_length:
+                batches.append(current)
+                current = ""
+            current = f"{current}\n\n{message}" if current else message
+        if current:
+            batches.append(current)
+        return batches
+
+    async def run(self):
+        while True:
+            messages = [await self.queue.get()]
+            # Espera o restante do ciclo de avaliação para enviar tudo de uma vez
+            await self.sleep(self.coalesce_delay)
+            while not self.queue.empty():
+                messages.append(self.queue.get_nowait())
+            for text in self.coalesce(messages):
+                await self.send(text)
+            for _ in messages:
+                self.queue.task_done()
+
+    async def send(self, text):
+        if self.metrics is None:
+            return await self._send(text)
+        with self.metrics.timer("notify"):
+            delivered = await self._send(text)
+        self.metrics.inc("telegram_messages_total", result="sent" if delivered else "failed")
+        return delivered
+
+    async def _send(self, text):
+        payload = {"chat_id": self.chat_id, "text": text}
+        error = None
+        for attempt in range(self.max_retries):
+            if attempt and self.metrics is not None:
+                self.metrics.inc("telegram_retries_total")
+            await self.bucket.acquire()
+            try:
+                await self.client.post_json(f"/bot{self.bot_token}/sendMessage", payload)
+                self.sent += 1
+                return True
+            except aiohttp.ClientResponseError as e:
+                error = e
+                if e.status == 429:
+                    # O Telegram informa quanto tempo esperar antes de tentar de novo
+                    retry_after = (e.headers or {}).get("Retry-After")
+                    await self.sleep(float(retry_after) if retry_after else self.backoff * 2 ** attempt)
+                    continue
+                if e.status < 500:
+                    break  # Erro do pedido (token, chat_id...): repetir não adianta
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            await self.sleep(self.backoff * 2 ** attempt)
+
+        self.failed += 1
+        if self.on_error:
+            self.on_error(error)
+        return False
@@ -0,0 +1,45 @@
+import os
+import numpy as np
+
+from candle_cache import KLINE_DTYPE
+
+
+class OHLCVStore:
+    """
+    Histórico de velas em disco: um arquivo .npy (mapeável em memória) por par/timeframe,
+    em `<root>/<PAR>/<timeframe>.npy`, ordenado por open_time e sem duplicatas.
+    """
+
+    def __init__(self, root="data/ohlcv"):
+        self.root = root
+
+    def path(self, symbol, timeframe):
+        return os.path.join(self.root, symbol, f"{timeframe}.npy")
+
+    def load(self, symbol, timeframe, mmap=True):
+        """Retorna o histórico salvo (array vazio se ainda não houver)."""
+        path = self.path(symbol, timeframe)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=KLINE_DTYPE)
+        return np.load(path, mmap_mode="r" if mmap else None)
+
+    def save(self, symbol, timeframe, rows):
+        path = self.path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Grava em arquivo temporário e troca de uma vez para não corromper o cache
+        temp_path = f"{path}.tmp.npy"
+        np.save(temp_path, np.ascontiguousarray(rows, dtype=KLINE_DTYPE))
+        os.replace(temp_path, path)
+
+    def merge(self, symbol, timeframe, rows):
+        """
+        Incorpora novas velas ao histórico salvo; em caso de open_time repetido, prevalece
+        a versão nova (a última vela pode ter sido salva ainda em formação).
+        """
+        existing = self.load(symbol, timeframe, mmap=False)
+        combined = np.concatenate((existing, np.asarray(rows, dtype=KLINE_DTYPE)))
+        # np.unique devolve a primeira ocorrência; invertendo, fica a mais recente
+        _, index = np.unique(combined["open_time"][::-1], return_index=True)
+        merged = combined[::-1][index]
+        self.save(symbol, timeframe, merged)
+        return merged
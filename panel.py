@@ -0,0 +1,207 @@
+"""
+Avaliação vetorizada da estratégia para vários pares de uma vez.
+
+O estado incremental dos indicadores de um timeframe fica em arrays indexados por par:
+uma janela deslizante com as últimas velas fechadas (Bollinger, estocástico e volume),
+os últimos %K (para o %D) e as médias de Wilder do RSI. A cada lote, as velas novas de
+todos os pares entram em um único passo NumPy e a vela em formação é avaliada em bloco,
+com a mesma regra do modo por par; os valores seguem o `StreamingIndicators`.
+"""
+import numpy as np
+
+from candle_cache import KLINE_DTYPE
+from strategy.rules import VOLUME_FACTOR, signal_labels, signal_masks
+
+PANEL_FIELDS = ("high", "low", "close", "volume")
+HIGH, LOW, CLOSE, VOLUME = range(len(PANEL_FIELDS))
+
+
+def _tail(history, current, period):
+    """Os últimos `period` valores: os `period - 1` mais recentes de `history` seguidos de `current`."""
+    return np.concatenate([history[:, history.shape[1] - period + 1:], current[:, None]], axis=1)
+
+
+class PanelIndicators:
+    """
+    Estado dos indicadores da estratégia para todos os pares de um timeframe.
+
+    Equivale a um `StreamingIndicators` por par, mas cada vela fechada é incorporada a
+    todos os pares com uma única operação por array.
+    """
+
+    def __init__(self, bb_period=21, std_dev_factor=2, k_period=14, d_period=3, rsi_window=14, volume_period=21):
+        self.bb_period = bb_period
+        self.std_dev_factor = std_dev_factor
+        self.k_period = k_period
+        self.d_period = d_period
+        self.rsi_window = rsi_window
+        self.volume_period = volume_period
+        self.alpha = 1.0 / rsi_window
+        self.index = {}  # par -> linha dos arrays de estado
+        self.window = np.empty((0, max(bb_period, k_period, volume_period), len(PANEL_FIELDS)))
+        self.k_history = np.empty((0, d_period))
+        self.avg_up = np.empty(0)
+        self.avg_down = np.empty(0)
+        self.prev_close = np.empty(0)
+        self.count = np.empty(0, dtype=np.int64)
+        self.last_open_time = np.empty(0, dtype=np.int64)
+
+    def _rows(self, symbols):
+        """Linhas de estado de `symbols`, criando as dos pares novos."""
+        new = [symbol for symbol in symbols if symbol not in self.index]
+        if new:
+            start = len(self.index)
+            self.index.update((symbol, start + i) for i, symbol in enumerate(new))
+            n = len(new)
+            self.window = np.concatenate([self.window, np.empty((n, *self.window.shape[1:]))])
+            self.k_history = np.concatenate([self.k_history, np.empty((n, self.d_period))])
+            self.avg_up = np.concatenate([self.avg_up, np.empty(n)])
+            self.avg_down = np.concatenate([self.avg_down, np.empty(n)])
+            self.prev_close = np.concatenate([self.prev_close, np.empty(n)])
+            self.count = np.concatenate([self.count, np.empty(n, dtype=np.int64)])
+            self.last_open_time = np.concatenate([self.last_open_time, np.empty(n, dtype=np.int64)])
+            self.reset(np.arange(start, start + n))
+        return np.array([self.index[symbol] for symbol in symbols], dtype=np.intp)
+
+    def reset(self, rows):
+        # NaN na janela faz os indicadores ficarem NaN até ela ser preenchida, como no modo por par
+        self.window[rows] = np.nan
+        self.k_history[rows] = np.nan
+        self.avg_up[rows] = 0.0
+        self.avg_down[rows] = 0.0
+        self.prev_close[rows] = np.nan
+        self.count[rows] = 0
+        self.last_open_time[rows] = -1
+
+    def _stochastic_k(self, high, low, close):
+        lowest, highest = low.min(axis=1), high.max(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(highest == lowest, np.nan, (close - lowest) / (highest - lowest) * 100)
+
+    def push(self, rows, candles):
+        """Incorpora uma vela fechada (`candles`: pares x campo) às linhas `rows`."""
+        window = self.window[rows]
+        window[:, :-1] = window[:, 1:]
+        window[:, -1] = candles
+        self.window[rows] = window
+
+        k_period = self.k_period
+        k = self._stochastic_k(window[:, -k_period:, HIGH], window[:, -k_period:, LOW], candles[:, CLOSE])
+        k_history = self.k_history[rows]
+        k_history[:, :-1] = k_history[:, 1:]
+        k_history[:, -1] = k
+        self.k_history[rows] = k_history
+
+        # Na primeira vela a diferença é NaN e conta como 0, como no ta
+        diff = candles[:, CLOSE] - self.prev_close[rows]
+        up = np.where(diff > 0, diff, 0.0)
+        down = np.where(diff < 0, -diff, 0.0)
+        self.avg_up[rows] = (1 - self.alpha) * self.avg_up[rows] + self.alpha * up
+        self.avg_down[rows] = (1 - self.alpha) * self.avg_down[rows] + self.alpha * down
+        self.prev_close[rows] = candles[:, CLOSE]
+        self.count[rows] += 1
+
+    def peek(self, rows, candles):
+        """Indicadores de todas as linhas `rows` se `candles` fosse a próxima vela, sem alterar o estado."""
+        window = self.window[rows]
+        high, low, close, volume = (candles[:, field] for field in (HIGH, LOW, CLOSE, VOLUME))
+
+        closes = _tail(window[:, :, CLOSE], close, self.bb_period)
+        sma = closes.mean(axis=1)
+        std = closes.std(axis=1, ddof=1)
+        k = self._stochastic_k(_tail(window[:, :, HIGH], high, self.k_period),
+                               _tail(window[:, :, LOW], low, self.k_period), close)
+        d = _tail(self.k_history[rows], k, self.d_period).mean(axis=1)
+
+        diff = close - self.prev_close[rows]
+        avg_up = (1 - self.alpha) * self.avg_up[rows] + self.alpha * np.where(diff > 0, diff, 0.0)
+        avg_down = (1 - self.alpha) * self.avg_down[rows] + self.alpha * np.where(diff < 0, -diff, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rsi = np.where(avg_down == 0, 100.0, 100 - (100 / (1 + avg_up / avg_down)))
+        rsi[self.count[rows] + 1 < self.rsi_window] = np.nan
+
+        return {
+            "SMA": sma,
+            "upper_band": sma + self.std_dev_factor * std,
+            "lower_band": sma - self.std_dev_factor * std,
+            "%K": k,
+            "%D": d,
+            "rsi": rsi,
+            "volume_ma": _tail(window[:, :, VOLUME], volume, self.volume_period).mean(axis=1),
+            "volume": volume,
+        }
+
+    def update(self, rows_by_symbol):
+        """
+        Atualiza o estado com as velas de cada par (arrays estruturados em ordem cronológica,
+        como `CandleRing.to_array()`) e retorna (lista de pares, indicadores da última vela
+        de cada par, um array por indicador).
+
+        Como no `StreamingIndicators.update`, todas as velas menos a última são consideradas
+        fechadas, e o par cuja última vela incorporada não está mais em `rows` é reconstruído.
+        """
+        symbols = list(rows_by_symbol)
+        if not symbols:
+            return symbols, {}
+        rows = self._rows(symbols)
+
+        # Velas de todos os pares alinhadas pelo fim; as posições vazias têm open_time -1
+        lengths = np.array([len(candles) for candles in rows_by_symbol.values()])
+        length = int(lengths.max())
+        if (lengths == length).all():
+            # Caso comum (cache cheio): uma cópia contígua, sem promover o dtype par a par como o np.stack
+            stacked = np.frombuffer(b"".join(np.ascontiguousarray(candles, dtype=KLINE_DTYPE).tobytes()
+                                             for candles in rows_by_symbol.values()),
+                                    dtype=KLINE_DTYPE).reshape(len(symbols), length)
+        else:
+            stacked = np.zeros((len(symbols), length), dtype=KLINE_DTYPE)
+            stacked["open_time"] = -1
+            for i, candles in enumerate(rows_by_symbol.values()):
+                stacked[i, length - len(candles):] = candles
+
+        last = self.last_open_time[rows]
+        seen = (stacked["open_time"] == last[:, None]) & (last[:, None] >= 0)
+        found = seen.any(axis=1)
+        self.reset(rows[~found])
+        start = np.where(found, seen.argmax(axis=1) + 1, length - lengths)
+
+        # Só as velas a partir da primeira ainda não incorporada (em regime, as duas últimas)
+        first = min(int(start.min()), length - 1)
+        candles = np.stack([stacked[field][:, first:] for field in PANEL_FIELDS], axis=-1)
+        for position in range(first, length - 1):
+            pushing = start <= position
+            self.push(rows[pushing], candles[pushing, position - first])
+        if length > 1:
+            pushed = start < length - 1
+            self.last_open_time[rows[pushed]] = stacked["open_time"][pushed, -2]
+
+        return symbols, self.peek(rows, candles[:, -1])
+
+
+class PanelEngine:
+    """Um `PanelIndicators` por timeframe."""
+
+    def __init__(self, **params):
+        self.params = params
+        self._panels = {}
+
+    def update(self, timeframe, rows_by_symbol):
+        if timeframe not in self._panels:
+            self._panels[timeframe] = PanelIndicators(**self.params)
+        return self._panels[timeframe].update(rows_by_symbol)
+
+
+def evaluate_indicators(indicators, prices, signal_choice="Ambos", volume_factor=VOLUME_FACTOR):
+    """
+    Aplica a regra de compra e venda da estratégia a todos os pares de uma vez.
+    Retorna um array com "COMPRA", "VENDA" ou None para cada par.
+    """
+    buy, sell = signal_masks(prices, indicators, signal_choice, volume_factor)
+    return signal_labels(buy, sell)
+
+
+def changed_signals(symbols, signals, previous_signals):
+    """Pares cujo sinal atual existe e é diferente do último notificado."""
+    previous = np.array(previous_signals, dtype=object)
+    changed = (signals != None) & (signals != previous)  # noqa: E711 (comparação elemento a elemento)
+    return [(symbols[i], signals[i]) for i in np.flatnonzero(changed)]
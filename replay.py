@@ -0,0 +1,302 @@
+"""
+Replay do monitor sobre o histórico local, com relógio virtual.
+
+As velas salvas no OHLCVStore passam pelo pipeline real do Monitor (agendador de
+fechamentos, busca incremental, decodificação, indicadores, controle de repetição em
+`last_notifications`) e pelo TelegramNotifier real (fila, agrupamento por ciclo, limite
+de taxa e repetições). Só os endpoints são substituídos: a Binance por um stub que
+serve o histórico e a Bot API do Telegram por um stub que registra o que recebe.
+
+O tempo é virtual: o loop asyncio do replay avança o relógio direto até o próximo
+timer em vez de esperar, então dias de mercado são reproduzidos em segundos, com a
+sequência exata de mensagens que teriam sido enviadas e o instante de cada envio.
+
+Uso: python replay.py --symbols BTCUSDT ETHUSDT --timeframes 1m 1h [--start 2024-01-01] [--end 2024-02-01]
+                      [--vectorized] [--quiet]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import selectors
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from market_data import INTERVAL_MS
+from metrics import Metrics
+from monitor import Monitor
+from notifier import TelegramNotifier
+from ohlcv_store import OHLCVStore
+from signal_store import SignalStore
+from strategy import TIMEFRAMES
+
+
+class VirtualClock:
+    """Relógio do replay, em segundos desde o epoch (como time.time)."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+
+# Folga somada a cada avanço do relógio virtual: em timestamps do epoch a precisão do
+# float (~0,2 µs) pode deixar o relógio logo antes do timer, que então nunca dispararia
+_TIME_SLACK = 1e-6
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """
+    Seletor que nunca bloqueia: quando o loop esperaria pelo próximo timer, o relógio
+    virtual avança esse tempo na hora.
+    """
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events:
+            if timeout is None:
+                raise RuntimeError("Replay parado: nenhuma tarefa aguardando o relógio.")
+            # Com timeout 0 há callbacks prontos: o tempo só anda quando o loop esperaria um timer
+            if timeout > 0:
+                self.clock.now += timeout + _TIME_SLACK
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """
+    Loop asyncio em tempo virtual: asyncio.sleep, wait_for e demais timers seguem o
+    `VirtualClock`, e todo o tempo de espera é pulado.
+    """
+
+    def __init__(self, clock):
+        super().__init__(_VirtualSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.now
+
+
+def encode_klines(rows):
+    """Velas no JSON compacto de /api/v3/klines (bytes), como a Binance as enviaria."""
+    return ("[" + ",".join(
+        f'[{open_time},"{open_}","{high}","{low}","{close}","{volume}",{close_time}]'
+        for open_time, open_, high, low, close, volume, close_time in rows.tolist()
+    ) + "]").encode()
+
+
+class ReplayBinanceClient:
+    """
+    Stub dos endpoints de mercado usados pelo monitor, servindo o histórico até o
+    instante atual do relógio virtual.
+
+    A vela em formação também é devolvida (com os valores finais, já que o histórico
+    não guarda as parciais); o monitor a descarta antes de avaliar. O preço atual de
+    cada par é a abertura da vela em formação do menor timeframe disponível.
+    """
+
+    def __init__(self, history, clock):
+        self.history = history  # (par, timeframe) -> velas ordenadas por open_time
+        self.clock = clock
+        self.requests = 0
+        self.used_weight = None
+        self._price_series = {}
+        for symbol, timeframe in history:
+            current = self._price_series.get(symbol)
+            if current is None or INTERVAL_MS[timeframe] < INTERVAL_MS[current]:
+                self._price_series[symbol] = timeframe
+
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+
+    async def get_time_offset(self):
+        return 0
+
+    async def get_klines_payload(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        self.requests += 1
+        rows = self.history[symbol, interval]
+        open_times = rows["open_time"]
+        end = self._now_ms() if endTime is None else min(endTime, self._now_ms())
+        stop = np.searchsorted(open_times, end, side="right")
+        if startTime is not None:
+            begin = np.searchsorted(open_times, startTime, side="left")
+            stop = min(stop, begin + limit)
+        else:
+            begin = max(0, stop - limit)
+        return encode_klines(rows[begin:stop])
+
+    async def get_symbol_ticker(self, symbol=None):
+        self.requests += 1
+        symbols = [symbol] if symbol else list(self._price_series)
+        now = self._now_ms()
+        tickers = []
+        for name in symbols:
+            rows = self.history[name, self._price_series[name]]
+            index = np.searchsorted(rows["open_time"], now, side="right") - 1
+            if index >= 0:
+                tickers.append({"symbol": name, "price": str(rows["open"][index])})
+        return tickers[0] if symbol else tickers
+
+    async def close(self):
+        pass
+
+
+class ReplayTelegramClient:
+    """Stub da Bot API: registra (instante virtual, texto) de cada sendMessage recebido."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    async def post_json(self, path, payload):
+        self.sent.append((self.clock(), payload["text"]))
+        return {"ok": True, "result": {"message_id": len(self.sent)}}
+
+    async def close(self):
+        pass
+
+
+def load_history(store, symbols, timeframes):
+    history = {}
+    for symbol in symbols:
+        for timeframe in timeframes:
+            rows = np.asarray(store.load(symbol, timeframe))
+            if not len(rows):
+                raise ValueError(f"Sem histórico local para {symbol} no timeframe {timeframe}.")
+            history[symbol, timeframe] = rows
+    return history
+
+
+def replay_bounds(history, warmup):
+    """
+    Período padrão: do primeiro instante em que todas as séries têm `warmup` velas
+    fechadas até o último fechamento comum a todas.
+    """
+    start = max(int(rows["open_time"][min(warmup, len(rows) - 1)]) for rows in history.values())
+    end = min(int(rows["open_time"][-1]) + INTERVAL_MS[timeframe] for (_, timeframe), rows in history.items())
+    return start, end
+
+
+def replay(symbols, timeframes, store=None, start=None, end=None, signal_choice="Ambos", vectorized=False,
+           quiet=True):
+    """
+    Reproduz o período [start, end) (ms) e retorna um dicionário com as mensagens
+    enviadas ao Telegram (instante virtual do envio, texto), os sinais emitidos
+    (vela, par, timeframe, sinal, preço), o número de velas avaliadas e a vazão.
+    """
+    store = store or OHLCVStore()
+    history = load_history(store, symbols, timeframes)
+    capacity = 50  # mesmo tamanho do cache de velas do monitor
+    default_start, default_end = replay_bounds(history, capacity)
+    start = default_start if start is None else start
+    end = default_end if end is None else end
+    if start >= end:
+        raise ValueError("Período de replay vazio.")
+
+    clock = VirtualClock(start / 1000)
+    client = ReplayBinanceClient(history, clock.time)
+    telegram = ReplayTelegramClient(clock.time)
+    metrics = Metrics(clock=clock.time)
+    notifier = TelegramNotifier("REPLAY", "REPLAY", client=telegram, clock=clock.time, metrics=metrics)
+    signal_store = SignalStore(":memory:", clock=clock.time)
+    monitor = Monitor(symbols, timeframes, signal_choice=signal_choice, notify_telegram=True,
+                      vectorized=vectorized, store=signal_store, client=client, notifier=notifier,
+                      clock=clock.time, metrics=metrics)
+    notifier.on_error = lambda e: monitor.report("error", f"Erro ao enviar mensagem para o Telegram: {e}")
+
+    # Velas que fecham dentro do período, por par/timeframe
+    bars = sum(
+        int(np.count_nonzero((rows["open_time"] >= start - INTERVAL_MS[timeframe])
+                             & (rows["open_time"] + INTERVAL_MS[timeframe] <= end)))
+        for (_, timeframe), rows in history.items()
+    )
+
+    async def run():
+        notifier.start()
+        pipeline = asyncio.ensure_future(monitor.notify_conditions())
+        # O agendador consulta cada vela 1 s após o fechamento; o último fechamento também é avaliado
+        await asyncio.sleep(end / 1000 + 1 - clock.time())
+        pipeline.cancel()
+        await asyncio.gather(pipeline, return_exceptions=True)
+        # Entrega as mensagens que ainda estavam na fila ou aguardando o agrupamento
+        await notifier.close()
+
+    loop = VirtualTimeLoop(clock)
+    started = time.perf_counter()
+    # As mensagens do monitor no terminal repetiriam os alertas, que já ficam no resultado
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+    elapsed = time.perf_counter() - started
+    signals = [(row["candle_time"], row["symbol"], row["timeframe"], row["signal"], row["price"])
+               for row in reversed(signal_store.recent_signals(limit=-1))]
+    signal_store.close()
+
+    return {
+        "start": start,
+        "end": end,
+        "alerts": telegram.sent,
+        "signals": signals,
+        "bars": bars,
+        "requests": client.requests,
+        "elapsed": elapsed,
+        "bars_per_second": bars / elapsed if elapsed else float("inf"),
+        "speedup": (end - start) / 1000 / elapsed if elapsed else float("inf"),
+        "metrics": monitor.metrics.snapshot(),
+    }
+
+
+def _parse_date(value):
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _format_time(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay do monitor sobre o histórico local (relógio virtual).")
+    parser.add_argument("--symbols", nargs="+", required=True, help="pares a reproduzir, ex.: BTCUSDT ETHUSDT")
+    parser.add_argument("--timeframes", nargs="+", required=True, choices=TIMEFRAMES)
+    parser.add_argument("--signals", default="Ambos", choices=["Compra", "Venda", "Ambos"])
+    parser.add_argument("--start", type=_parse_date, help="início do período (UTC), ex.: 2024-01-01")
+    parser.add_argument("--end", type=_parse_date, help="fim do período (UTC), ex.: 2024-02-01T12:00")
+    parser.add_argument("--vectorized", action="store_true", help="avalia todos os pares de uma vez")
+    parser.add_argument("--data", default="data/ohlcv", help="diretório do histórico local (OHLCVStore)")
+    parser.add_argument("--quiet", action="store_true", help="mostra só o resumo, sem a lista de alertas")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        result = replay(args.symbols, args.timeframes, store=OHLCVStore(args.data), start=args.start, end=args.end,
+                        signal_choice=args.signals, vectorized=args.vectorized)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        for sent_at, text in result["alerts"]:
+            # Cada envio pode agrupar vários sinais do mesmo ciclo
+            for message in text.split("\n\n"):
+                print(f"[{_format_time(sent_at)}] {' '.join(message.split())}")
+    print(f"Período: {_format_time(result['start'] / 1000)} a {_format_time(result['end'] / 1000)} (UTC)")
+    print(f"{result['bars']:,} velas avaliadas em {result['elapsed']:.2f}s "
+          f"({result['bars_per_second']:,.0f} velas/s, {result['speedup']:,.0f}x o tempo real), "
+          f"{len(result['signals'])} sinais em {len(result['alerts'])} mensagens, "
+          f"{result['requests']:,} requisições ao stub")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
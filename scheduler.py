@@ -0,0 +1,52 @@
+import asyncio
+import heapq
+import time
+
+from market_data import INTERVAL_MS
+
+
+def last_close_time(now_ms, timeframe):
+    """Início da vela atual, ou seja, o fechamento mais recente (as velas são alinhadas ao epoch UTC)."""
+    interval = INTERVAL_MS[timeframe]
+    return now_ms // interval * interval
+
+
+class CandleScheduler:
+    """
+    Fila de prioridade com o próximo fechamento de vela de cada (par, timeframe).
+
+    Os horários seguem o relógio do servidor (`offset_ms` é a diferença servidor - local,
+    como a calculada pelo sync_time). `next_batch` espera o próximo fechamento e devolve
+    de uma vez todas as chaves que fecharam até ali, `delay_ms` depois do fechamento para
+    a vela já estar consolidada na Binance.
+    """
+
+    def __init__(self, keys, offset_ms=0, delay_ms=1000, clock=time.time, sleep=asyncio.sleep):
+        self.offset_ms = offset_ms
+        self.delay_ms = delay_ms
+        self.clock = clock
+        self.sleep = sleep
+        now = self.server_time_ms()
+        # Começa pelo último fechamento: a primeira rodada avalia tudo imediatamente
+        self.heap = [(last_close_time(now, timeframe), symbol, timeframe) for symbol, timeframe in keys]
+        heapq.heapify(self.heap)
+
+    def server_time_ms(self):
+        return int(self.clock() * 1000) + self.offset_ms
+
+    async def next_batch(self):
+        """Retorna a lista de (par, timeframe, fechamento) que acabaram de fechar."""
+        wait_ms = self.heap[0][0] + self.delay_ms - self.server_time_ms()
+        if wait_ms > 0:
+            await self.sleep(wait_ms / 1000)
+
+        now = self.server_time_ms()
+        batch = []
+        while self.heap and self.heap[0][0] + self.delay_ms <= now:
+            close_time, symbol, timeframe = heapq.heappop(self.heap)
+            # Se o monitor ficou parado, avalia direto o fechamento mais recente
+            close_time = max(close_time, last_close_time(now - self.delay_ms, timeframe))
+            batch.append((symbol, timeframe, close_time))
+        for symbol, timeframe, close_time in batch:
+            heapq.heappush(self.heap, (close_time + INTERVAL_MS[timeframe], symbol, timeframe))
+        return batch
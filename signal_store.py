@@ -0,0 +1,182 @@
+"""
+Canal local entre o monitor (processo único) e a interface Streamlit.
+
+O monitor grava sinais, eventos e o seu estado em um banco SQLite; qualquer número de
+sessões do Streamlit apenas lê o banco, sem fazer chamadas à API.
+
+A tabela `signals` é um journal só de inserção com todos os sinais emitidos; a tabela
+`last_signals` guarda o último sinal por (par, timeframe) e, junto com `candle_state`,
+permite que o monitor reinicie sem repetir alertas nem baixar todas as velas de novo.
+"""
+import json
+import sqlite3
+import time
+
+import numpy as np
+
+from candle_cache import KLINE_DTYPE
+
+# Prazo (s) para um monitor recém-lançado gravar o primeiro heartbeat; depois disso a marca
+# de inicialização expira (o processo pode ter falhado antes de abrir o banco)
+STARTUP_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    price REAL,
+    message TEXT,
+    candle_time INTEGER
+);
+CREATE TABLE IF NOT EXISTS last_signals (
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    candle_time INTEGER,
+    signal_id INTEGER NOT NULL,
+    PRIMARY KEY (symbol, timeframe)
+);
+CREATE TABLE IF NOT EXISTS candle_state (
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    rows BLOB NOT NULL,
+    PRIMARY KEY (symbol, timeframe)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS status (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SignalStore:
+    def __init__(self, path="signals.db", clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: a interface lê enquanto o monitor escreve, sem bloqueios
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Atualiza bancos criados por versões anteriores."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(signals)")}
+        if "candle_time" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE signals ADD COLUMN candle_time INTEGER")
+        with self.conn:
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS signals_symbol_timeframe ON signals (symbol, timeframe, id)"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    # Escrita (monitor)
+    def add_signal(self, symbol, timeframe, signal, price, message, candle_time=None):
+        candle_time = None if candle_time is None else int(candle_time)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO signals (created_at, symbol, timeframe, signal, price, message, candle_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.clock(), symbol, timeframe, signal, float(price), message, candle_time),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO last_signals (symbol, timeframe, signal, candle_time, signal_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (symbol, timeframe, signal, candle_time, cursor.lastrowid),
+            )
+
+    def add_event(self, level, message):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO events (created_at, level, message) VALUES (?, ?, ?)",
+                (self.clock(), level, message),
+            )
+
+    def set_status(self, **values):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO status (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in values.items()],
+            )
+
+    def save_candles(self, candles):
+        """Grava as velas em cache; `candles` é um iterável de (par, timeframe, array estruturado)."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candle_state (symbol, timeframe, rows) VALUES (?, ?, ?)",
+                [(symbol, timeframe, np.ascontiguousarray(rows, dtype=KLINE_DTYPE).tobytes())
+                 for symbol, timeframe, rows in candles],
+            )
+
+    # Restauração (monitor)
+    def last_signal(self, symbol, timeframe):
+        row = self.conn.execute(
+            "SELECT signal FROM last_signals WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+        ).fetchone()
+        return row["signal"] if row else None
+
+    def last_signals(self):
+        """Último sinal de cada (par, timeframe), no formato de `last_notifications`."""
+        rows = self.conn.execute("SELECT symbol, timeframe, signal FROM last_signals")
+        return {f"{row['symbol']}_{row['timeframe']}": row["signal"] for row in rows}
+
+    def load_candles(self):
+        rows = self.conn.execute("SELECT symbol, timeframe, rows FROM candle_state")
+        return [(row["symbol"], row["timeframe"], np.frombuffer(row["rows"], dtype=KLINE_DTYPE).copy())
+                for row in rows]
+
+    # Leitura (interface)
+    def get_status(self):
+        rows = self.conn.execute("SELECT key, value FROM status").fetchall()
+        return {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def is_monitor_running(self, max_silence=30):
+        """O monitor é considerado ativo se atualizou o heartbeat há menos de `max_silence` segundos."""
+        heartbeat = self.get_status().get("heartbeat")
+        return heartbeat is not None and self.clock() - heartbeat < max_silence
+
+    def is_monitor_starting(self, timeout=STARTUP_TIMEOUT):
+        """Há um monitor lançado pela interface que ainda não gravou o primeiro heartbeat."""
+        starting_at = self.get_status().get("starting_at")
+        return starting_at is not None and self.clock() - starting_at < timeout
+
+    def claim_start(self, max_silence=30, timeout=STARTUP_TIMEOUT):
+        """
+        Reserva o lançamento de um monitor: grava a marca `starting_at` e descarta pedidos de
+        parada antigos, a menos que já exista um monitor ativo ou iniciando. A verificação e a
+        escrita ocorrem na mesma transação (BEGIN IMMEDIATE), então entre sessões que clicam
+        ao mesmo tempo só uma recebe True e lança o processo.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.is_monitor_running(max_silence) or self.is_monitor_starting(timeout):
+                return False
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO status (key, value) VALUES (?, ?)",
+                [("starting_at", json.dumps(self.clock())), ("stop_requested", json.dumps(False))],
+            )
+        return True
+
+    def recent_signals(self, limit=100):
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM signals ORDER BY id DESC LIMIT ?", (limit,)
+        )]
+
+    def recent_events(self, limit=20):
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM events ORDER BY id DESC LIMIT ?", (limit,)
+        )]
@@ -0,0 +1,12 @@
+"""
+Núcleo da estratégia compartilhado pelo monitor, pela interface, pelo painel e pelo backtest.
+
+- `kernels`: indicadores em lote sobre arrays float64 (backtest, varredura);
+- `incremental`: os mesmos indicadores atualizados vela a vela (monitor);
+- `rules`: a regra de compra e venda, aplicada a escalares ou arrays;
+- `universe`: pares e timeframes padrão.
+"""
+from strategy.kernels import batch_indicators, frame_indicators
+from strategy.rules import BUY, SELL, evaluate_signal, signal_labels, signal_masks
+from strategy.incremental import IndicatorEngine, StreamingIndicators
+from strategy.universe import SYMBOLS, TIMEFRAMES
@@ -0,0 +1,253 @@
+"""
+Modo incremental da estratégia: cada vela nova custa O(1), sem recalcular a janela inteira.
+
+Os valores acompanham os kernels em lote de `strategy.kernels` (e, portanto, as
+implementações em pandas/ta: rolling().mean(), rolling().std(), rolling().min()/max() e RSIIndicator).
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float("nan")
+
+
+class RollingStats:
+    """
+    Média e desvio padrão amostral (ddof=1) de uma janela deslizante, via Welford.
+    Valores NaN dentro da janela tornam o resultado NaN, como no pandas.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.count = 0  # valores não-NaN na janela
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @staticmethod
+    def _add(count, mean, m2, x):
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += delta * (x - mean)
+        return count, mean, m2
+
+    @staticmethod
+    def _remove(count, mean, m2, x):
+        if count == 1:
+            return 0, 0.0, 0.0
+        count -= 1
+        delta = x - mean
+        mean -= delta / count
+        m2 -= delta * (x - mean)
+        return count, mean, m2
+
+    def _next_state(self, x):
+        count, mean, m2, nan_count = self.count, self.mean, self.m2, self.nan_count
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if math.isnan(old):
+                nan_count -= 1
+            else:
+                count, mean, m2 = self._remove(count, mean, m2, old)
+        if math.isnan(x):
+            nan_count += 1
+        else:
+            count, mean, m2 = self._add(count, mean, m2, x)
+        return count, mean, max(m2, 0.0), nan_count
+
+    def _result(self, size, count, mean, m2, nan_count):
+        if size < self.window or nan_count:
+            return NAN, NAN
+        std = math.sqrt(m2 / (count - 1)) if count > 1 else NAN
+        return mean, std
+
+    def push(self, x):
+        self.count, self.mean, self.m2, self.nan_count = self._next_state(x)
+        if len(self.values) == self.window:
+            self.values.popleft()
+        self.values.append(x)
+        return self._result(len(self.values), self.count, self.mean, self.m2, self.nan_count)
+
+    def peek(self, x):
+        """Resultado se `x` fosse o próximo valor, sem alterar o estado."""
+        size = min(len(self.values) + 1, self.window)
+        return self._result(size, *self._next_state(x))
+
+
+class RollingExtreme:
+    """
+    Mínimo (ou máximo) de uma janela deslizante com deque monotônico.
+    """
+
+    def __init__(self, window, mode="min"):
+        self.window = window
+        self.better = (lambda a, b: a <= b) if mode == "min" else (lambda a, b: a >= b)
+        self.index = -1
+        self.candidates = deque()  # pares (índice, valor), valores monotônicos
+
+    def push(self, x):
+        self.index += 1
+        while self.candidates and self.better(x, self.candidates[-1][1]):
+            self.candidates.pop()
+        self.candidates.append((self.index, x))
+        if self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+        return self.candidates[0][1] if self.index + 1 >= self.window else NAN
+
+    def peek(self, x):
+        index = self.index + 1
+        if index + 1 < self.window:
+            return NAN
+        # Descarta o candidato que sairia da janela; o seguinte é o extremo do restante
+        position = 1 if self.candidates and self.candidates[0][0] <= index - self.window else 0
+        if position < len(self.candidates):
+            best = self.candidates[position][1]
+            return x if self.better(x, best) else best
+        return x
+
+
+class WilderRSI:
+    """
+    RSI com suavização de Wilder (EMA com alpha=1/window), equivalente ao RSIIndicator do ta.
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.alpha = 1.0 / window
+        self.count = 0
+        self.prev_close = None
+        self.avg_up = 0.0
+        self.avg_down = 0.0
+
+    def _next_state(self, close):
+        if self.prev_close is None:
+            # A primeira diferença é NaN e o ta a trata como 0
+            return 0.0, 0.0
+        diff = close - self.prev_close
+        up = diff if diff > 0 else 0.0
+        down = -diff if diff < 0 else 0.0
+        return (
+            (1 - self.alpha) * self.avg_up + self.alpha * up,
+            (1 - self.alpha) * self.avg_down + self.alpha * down,
+        )
+
+    def _result(self, count, avg_up, avg_down):
+        if count < self.window:
+            return NAN
+        if avg_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + avg_up / avg_down))
+
+    def push(self, close):
+        self.avg_up, self.avg_down = self._next_state(close)
+        self.prev_close = close
+        self.count += 1
+        return self._result(self.count, self.avg_up, self.avg_down)
+
+    def peek(self, close):
+        return self._result(self.count + 1, *self._next_state(close))
+
+
+class StreamingIndicators:
+    """
+    Estado dos indicadores da estratégia para um par/timeframe.
+
+    As velas fechadas são incorporadas com `push`; a vela em formação é avaliada com
+    `peek`, que pode ser chamado quantas vezes for preciso sem alterar o estado.
+    """
+
+    def __init__(self, bb_period=21, std_dev_factor=2, k_period=14, d_period=3, rsi_window=14, volume_period=21):
+        self.params = (bb_period, std_dev_factor, k_period, d_period, rsi_window, volume_period)
+        self.reset()
+
+    def reset(self):
+        bb_period, self.std_dev_factor, k_period, d_period, rsi_window, volume_period = self.params
+        self.bollinger = RollingStats(bb_period)
+        self.lowest = RollingExtreme(k_period, "min")
+        self.highest = RollingExtreme(k_period, "max")
+        self.stoch_d = RollingStats(d_period)
+        self.rsi = WilderRSI(rsi_window)
+        self.volume = RollingStats(volume_period)
+        self.last_open_time = None
+
+    @staticmethod
+    def _stochastic_k(close, lowest, highest):
+        if math.isnan(lowest) or math.isnan(highest) or highest == lowest:
+            return NAN
+        return (close - lowest) / (highest - lowest) * 100
+
+    def _values(self, sma, std, lowest, highest, k, d, rsi, volume_ma, volume):
+        return {
+            "SMA": sma,
+            "upper_band": sma + self.std_dev_factor * std,
+            "lower_band": sma - self.std_dev_factor * std,
+            "%K": k,
+            "%D": d,
+            "rsi": rsi,
+            "volume_ma": volume_ma,
+            "volume": volume,
+        }
+
+    def push(self, high, low, close, volume):
+        sma, std = self.bollinger.push(close)
+        lowest = self.lowest.push(low)
+        highest = self.highest.push(high)
+        k = self._stochastic_k(close, lowest, highest)
+        d, _ = self.stoch_d.push(k)
+        rsi = self.rsi.push(close)
+        volume_ma, _ = self.volume.push(volume)
+        return self._values(sma, std, lowest, highest, k, d, rsi, volume_ma, volume)
+
+    def peek(self, high, low, close, volume):
+        sma, std = self.bollinger.peek(close)
+        lowest = self.lowest.peek(low)
+        highest = self.highest.peek(high)
+        k = self._stochastic_k(close, lowest, highest)
+        d, _ = self.stoch_d.peek(k)
+        rsi = self.rsi.peek(close)
+        volume_ma, _ = self.volume.peek(volume)
+        return self._values(sma, std, lowest, highest, k, d, rsi, volume_ma, volume)
+
+    def update(self, rows):
+        """
+        Atualiza o estado com as velas de `rows` (array estruturado em ordem cronológica,
+        como `CandleRing.to_array()`) e retorna os indicadores da última vela.
+
+        Todas as velas menos a última são consideradas fechadas. Se a última vela
+        incorporada não estiver mais em `rows` (lacuna), o estado é reconstruído.
+        """
+        open_times = rows["open_time"]
+        if self.last_open_time is None:
+            start = 0
+        else:
+            start = int(np.searchsorted(open_times, self.last_open_time))
+            if start == len(open_times) or open_times[start] != self.last_open_time:
+                self.reset()
+                start = 0
+            else:
+                start += 1
+
+        for row in rows[start:-1]:
+            self.push(row["high"], row["low"], row["close"], row["volume"])
+        if len(rows) > 1 and start < len(rows) - 1:
+            self.last_open_time = int(open_times[-2])
+
+        last = rows[-1]
+        return self.peek(last["high"], last["low"], last["close"], last["volume"])
+
+
+class IndicatorEngine:
+    """Um `StreamingIndicators` por (par, timeframe)."""
+
+    def __init__(self, **params):
+        self.params = params
+        self._states = {}
+
+    def update(self, symbol, timeframe, rows):
+        key = (symbol, timeframe)
+        if key not in self._states:
+            self._states[key] = StreamingIndicators(**self.params)
+        return self._states[key].update(rows)
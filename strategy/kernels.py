@@ -0,0 +1,109 @@
+"""
+Modo em lote da estratégia: indicadores de uma série inteira de velas de uma vez.
+
+Entradas e saídas são arrays float64 do mesmo tamanho das velas; as primeiras posições,
+sem histórico suficiente, ficam com NaN. As janelas usam os algoritmos O(n) do pandas
+(rolling/ewm) sobre os arrays, sem copiar os dados.
+
+Arrays 2-D são aceitos com o tempo no eixo 0 e um par por coluna (tempo x pares), para
+calcular o histórico de vários pares em uma chamada.
+"""
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+
+FloatArray = npt.NDArray[np.float64]
+
+
+def _as_float(values: npt.ArrayLike) -> FloatArray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _series(values: npt.ArrayLike) -> pd.Series | pd.DataFrame:
+    values = _as_float(values)
+    if values.ndim == 2:
+        return pd.DataFrame(values, copy=False)
+    return pd.Series(values, copy=False)
+
+
+def rolling_mean(values: FloatArray, window: int) -> FloatArray:
+    return _series(values).rolling(window).mean().to_numpy()
+
+
+def rolling_std(values: FloatArray, window: int) -> FloatArray:
+    """Desvio padrão amostral (ddof=1), como rolling().std()."""
+    return _series(values).rolling(window).std().to_numpy()
+
+
+def rolling_min(values: FloatArray, window: int) -> FloatArray:
+    return _series(values).rolling(window).min().to_numpy()
+
+
+def rolling_max(values: FloatArray, window: int) -> FloatArray:
+    return _series(values).rolling(window).max().to_numpy()
+
+
+def bollinger_bands(close: FloatArray, period: int = 21,
+                    std_dev_factor: float = 2) -> tuple[FloatArray, FloatArray, FloatArray]:
+    """Retorna (SMA, banda superior, banda inferior)."""
+    sma = rolling_mean(close, period)
+    width = std_dev_factor * rolling_std(close, period)
+    return sma, sma + width, sma - width
+
+
+def stochastic_k(high: FloatArray, low: FloatArray, close: FloatArray, k_period: int = 14) -> FloatArray:
+    """%K; é NaN quando máxima e mínima da janela coincidem."""
+    lowest = rolling_min(low, k_period)
+    highest = rolling_max(high, k_period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = (_as_float(close) - lowest) / (highest - lowest) * 100
+    k[~np.isfinite(k)] = np.nan
+    return k
+
+
+def stochastic(high: FloatArray, low: FloatArray, close: FloatArray, k_period: int = 14,
+               d_period: int = 3) -> tuple[FloatArray, FloatArray]:
+    """Retorna (%K, %D), com %D a média móvel de `d_period` velas do %K."""
+    k = stochastic_k(high, low, close, k_period)
+    return k, rolling_mean(k, d_period)
+
+
+def wilder_rsi(close: FloatArray, window: int = 14) -> FloatArray:
+    """RSI com suavização de Wilder (EMA com alpha=1/window), equivalente ao RSIIndicator do ta."""
+    diff = np.diff(_as_float(close), axis=0, prepend=np.nan)
+    # A primeira diferença é NaN e o ta a trata como 0
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ewm = dict(alpha=1.0 / window, min_periods=window, adjust=False)
+    avg_up = _series(up).ewm(**ewm).mean().to_numpy()
+    avg_down = _series(down).ewm(**ewm).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_up / avg_down)
+    return np.where(avg_down == 0, 100.0, rsi)
+
+
+def batch_indicators(high: FloatArray, low: FloatArray, close: FloatArray, volume: FloatArray, bb_period: int = 21,
+                     std_dev_factor: float = 2, k_period: int = 14, d_period: int = 3, rsi_window: int = 14,
+                     volume_period: int = 21) -> dict[str, FloatArray]:
+    """
+    Indicadores da estratégia para cada vela, com as mesmas chaves de
+    `StreamingIndicators` (cada valor é um array do tamanho da série).
+    """
+    sma, upper_band, lower_band = bollinger_bands(close, bb_period, std_dev_factor)
+    k, d = stochastic(high, low, close, k_period, d_period)
+    return {
+        "SMA": sma,
+        "upper_band": upper_band,
+        "lower_band": lower_band,
+        "%K": k,
+        "%D": d,
+        "rsi": wilder_rsi(close, rsi_window),
+        "volume_ma": rolling_mean(volume, volume_period),
+        "volume": _as_float(volume),
+    }
+
+
+def frame_indicators(df: pd.DataFrame, **params) -> dict[str, FloatArray]:
+    """`batch_indicators` sobre as colunas de um DataFrame de velas."""
+    return batch_indicators(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+                            df['volume'].to_numpy(), **params)
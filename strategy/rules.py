@@ -0,0 +1,59 @@
+"""
+Regra de compra e venda da estratégia, a mesma para o monitor, o painel e o backtest.
+
+As comparações são elemento a elemento: funcionam com escalares (uma vela) e com
+arrays (a série inteira do backtest ou um valor por par no painel). Comparações com
+NaN (indicador sem histórico suficiente) resultam em False.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import numpy.typing as npt
+
+from strategy.kernels import FloatArray
+
+# Um valor por vela (escalar) ou uma série/um valor por par (array)
+Values = float | FloatArray
+
+BUY, SELL = "COMPRA", "VENDA"
+
+# Opções do seletor de sinais que habilitam cada lado
+BUY_CHOICES = ("Compra", "Ambos")
+SELL_CHOICES = ("Venda", "Ambos")
+
+STOCH_LEVELS = (20, 80)
+RSI_LEVELS = (30, 70)
+VOLUME_FACTOR = 3
+
+
+def signal_masks(price: Values, indicators: Mapping[str, Values], signal_choice: str = "Ambos",
+                 volume_factor: float = VOLUME_FACTOR, stoch_levels: tuple[float, float] = STOCH_LEVELS,
+                 rsi_levels: tuple[float, float] = RSI_LEVELS) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.bool_]]:
+    """
+    Retorna (compra, venda): preço fora das bandas de Bollinger, %K e %D nas zonas
+    extremas, volume acima de `volume_factor` vezes a média e RSI sobrevendido/sobrecomprado.
+    """
+    stoch_low, stoch_high = stoch_levels
+    rsi_low, rsi_high = rsi_levels
+    k, d, rsi = indicators["%K"], indicators["%D"], indicators["rsi"]
+    with np.errstate(invalid="ignore"):
+        high_volume = indicators["volume"] > volume_factor * indicators["volume_ma"]
+        buy = (price < indicators["lower_band"]) & (k < stoch_low) & (d < stoch_low) & high_volume & (rsi < rsi_low)
+        sell = (price > indicators["upper_band"]) & (k > stoch_high) & (d > stoch_high) & high_volume & (rsi > rsi_high)
+    return buy & (signal_choice in BUY_CHOICES), sell & (signal_choice in SELL_CHOICES)
+
+
+def evaluate_signal(price: float, indicators: Mapping[str, float], signal_choice: str = "Ambos",
+                    **rule) -> str | None:
+    """Sinal de uma única vela: "COMPRA", "VENDA" ou None."""
+    buy, sell = signal_masks(price, indicators, signal_choice, **rule)
+    if buy:
+        return BUY
+    if sell:
+        return SELL
+    return None
+
+
+def signal_labels(buy: npt.NDArray[np.bool_], sell: npt.NDArray[np.bool_]) -> npt.NDArray[np.object_]:
+    """Array com "COMPRA", "VENDA" ou None a partir das máscaras de `signal_masks`."""
+    return np.where(buy, BUY, np.where(sell, SELL, None))
@@ -0,0 +1,9 @@
+# Pares monitorados pela interface e usados no backtest
+SYMBOLS = [
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "DOTUSDT", "DOGEUSDT", "FTMUSDT", "ASTRUSDT", "XRPUSDT", "SOLUSDT",
+    "LTCUSDT", "PENDLEUSDT", "AAVEUSDT", "ORDIUSDT", "UNIUSDT", "LINKUSDT",
+    "ENSUSDT", "MOVRUSDT", "ARBUSDT", "TRBUSDT", "MANTAUSDT", "AVAXUSDT", "ADAUSDT", "GALAUSDT", "LDOUSDT",
+]
+
+# Timeframes disponíveis
+TIMEFRAMES = ["1m", "5m", "15m", "1h", "4h", "1d"]
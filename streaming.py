@@ -0,0 +1,95 @@
+import asyncio
+import json
+import aiohttp
+
+from candle_cache import decode_klines
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+
+
+def kline_event_to_row(kline):
+    """Converte o campo `k` de um evento de kline para o formato da resposta REST."""
+    return [kline["t"], kline["o"], kline["h"], kline["l"], kline["c"], kline["v"], kline["T"]]
+
+
+class KlineStream:
+    """
+    Recebe klines de todos os pares/timeframes por uma única conexão WebSocket multiplexada.
+
+    A cada (re)conexão as lacunas são preenchidas via REST antes de processar os eventos;
+    depois disso o cache é atualizado apenas pelo stream e `on_candle(symbol, timeframe,
+    ring, closed)` é chamado a cada vela atualizada ou fechada. Uma falha no backfill de
+    um par/timeframe (ex.: par inválido ou deslistado) é informada a
+    `on_backfill_error(symbol, timeframe, erro)` sem interromper o stream dos demais.
+    """
+
+    def __init__(self, client, cache, symbols, timeframes, on_candle,
+                 base_url=BINANCE_STREAM_URL, reconnect_delay=1, max_reconnect_delay=60, on_error=None,
+                 on_backfill_error=None):
+        self.client = client
+        self.cache = cache
+        self.symbols = symbols
+        self.timeframes = timeframes
+        self.on_candle = on_candle
+        self.base_url = base_url.rstrip("/")
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.on_error = on_error
+        self.on_backfill_error = on_backfill_error
+
+    @property
+    def url(self):
+        streams = "/".join(
+            f"{symbol.lower()}@kline_{timeframe}" for symbol in self.symbols for timeframe in self.timeframes
+        )
+        return f"{self.base_url}/stream?streams={streams}"
+
+    async def backfill(self):
+        """
+        Busca via REST as velas que faltam no cache para cada par/timeframe.
+        Retorna o número de pares/timeframes cujo backfill falhou.
+        """
+        async def fill(symbol, timeframe):
+            try:
+                params = self.cache.request_params(symbol, timeframe)
+                payload = await self.client.get_klines_payload(symbol, timeframe, **params)
+                self.cache.merge(symbol, timeframe, decode_klines(payload))
+                return True
+            except Exception as e:
+                if self.on_backfill_error:
+                    self.on_backfill_error(symbol, timeframe, e)
+                return False
+
+        results = await asyncio.gather(*(fill(symbol, timeframe)
+                                         for symbol in self.symbols for timeframe in self.timeframes))
+        return results.count(False)
+
+    async def handle_message(self, message):
+        data = message.get("data", message)
+        if data.get("e") != "kline":
+            return
+        kline = data["k"]
+        symbol, timeframe = data["s"], kline["i"]
+        ring = self.cache.merge(symbol, timeframe, [kline_event_to_row(kline)])
+        await self.on_candle(symbol, timeframe, ring, kline["x"])
+
+    async def run(self):
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=30) as ws:
+                        # Conecta antes do backfill para não perder eventos; os eventos
+                        # recebidos nesse meio tempo ficam no buffer do WebSocket
+                        await self.backfill()
+                        delay = self.reconnect_delay
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                await self.handle_message(json.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if self.on_error:
+                        self.on_error(e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
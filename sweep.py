@@ -0,0 +1,122 @@
+"""
+Varredura de parâmetros da estratégia (grid search) sobre o histórico local.
+
+Cada série de indicador é calculada uma única vez por valor de parâmetro e reaproveitada
+por todas as combinações; os limiares de RSI são aplicados em bloco (broadcast) sobre a
+mesma série.
+
+Uso: python sweep.py --symbols BTCUSDT ETHUSDT --timeframes 1h 4h [--offline]
+"""
+import argparse
+import itertools
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtesting import calculate_drawdown, calculate_hit_rate, fetch_historical_data, ohlcv_store, simulate_trades
+from strategy.kernels import rolling_mean, rolling_std, stochastic_k, wilder_rsi
+
+# Grade padrão (os valores atuais da estratégia estão incluídos)
+DEFAULT_GRID = {
+    "bb_period": [14, 21, 28],
+    "bb_std": [1.5, 2.0, 2.5],
+    "k_period": [9, 14, 21],
+    "d_period": [3, 5],
+    "stoch_levels": [(10, 90), (20, 80), (30, 70)],
+    "rsi_window": [7, 14, 21],
+    "rsi_levels": [(25, 75), (30, 70), (35, 65)],
+    "volume_mult": [0, 1.5, 2, 3],  # 0 desativa o filtro de volume
+}
+
+
+def _metrics(events, balance, position, last_price, initial_balance):
+    trades = [{'type': kind, 'price': price, 'size': size} for kind, _, price, size in events]
+    final_balance = balance + (position * last_price if position > 0 else 0)
+    hit_rate, total_trades = calculate_hit_rate(trades)
+    return final_balance, final_balance - initial_balance, calculate_drawdown(trades), hit_rate, total_trades
+
+
+def run_sweep(df, grid=DEFAULT_GRID, initial_balance=100, trade_size=0.1):
+    """
+    Avalia todas as combinações de `grid` sobre as velas de `df` com a regra da estratégia
+    (bandas de Bollinger + %K/%D + RSI + filtro de volume) e retorna um DataFrame ordenado
+    pelo lucro.
+    """
+    close = df['close'].to_numpy()
+    highs = df['high'].to_numpy()
+    lows = df['low'].to_numpy()
+    volume = df['volume'].to_numpy()
+    last_price = close[-1]
+
+    # Séries compartilhadas, calculadas uma vez por valor de parâmetro
+    bands = {}
+    for period in grid["bb_period"]:
+        sma, std = rolling_mean(close, period), rolling_std(close, period)
+        for factor in grid["bb_std"]:
+            bands[period, factor] = (close < sma - factor * std, close > sma + factor * std)
+
+    # %K depende só de k_period; o %D é a média do mesmo %K para cada d_period
+    stoch = {}
+    for k_period in grid["k_period"]:
+        k = stochastic_k(highs, lows, close, k_period)
+        for d_period in grid["d_period"]:
+            d = rolling_mean(k, d_period)
+            for low, high in grid["stoch_levels"]:
+                stoch[k_period, d_period, low, high] = ((k < low) & (d < low), (k > high) & (d > high))
+
+    volume_ma = rolling_mean(volume, 21)
+    volume_ok = {mult: np.ones(len(df), dtype=bool) if mult == 0 else volume > mult * volume_ma
+                 for mult in grid["volume_mult"]}
+
+    # Limiares de RSI empilhados: uma linha por (janela, níveis) para o broadcast
+    rsi_keys = list(itertools.product(grid["rsi_window"], grid["rsi_levels"]))
+    rsi_series = {window: wilder_rsi(close, window) for window in grid["rsi_window"]}
+    rsi_buy = np.array([rsi_series[window] < low for window, (low, _) in rsi_keys])
+    rsi_sell = np.array([rsi_series[window] > high for window, (_, high) in rsi_keys])
+
+    results = []
+    for (bb_key, (below, above)), (st_key, (st_buy, st_sell)), mult in itertools.product(
+        bands.items(), stoch.items(), grid["volume_mult"]
+    ):
+        buy_signals = (below & st_buy & volume_ok[mult]) & rsi_buy
+        sell_signals = (above & st_sell & volume_ok[mult]) & rsi_sell
+        for (rsi_window, (rsi_low, rsi_high)), buy, sell in zip(rsi_keys, buy_signals, sell_signals):
+            balance, position, events = simulate_trades(close, buy, sell, initial_balance, trade_size)
+            results.append((*bb_key, *st_key, rsi_window, rsi_low, rsi_high, mult,
+                            *_metrics(events, balance, position, last_price, initial_balance)))
+
+    columns = ["bb_period", "bb_std", "k_period", "d_period", "stoch_low", "stoch_high",
+               "rsi_window", "rsi_low", "rsi_high", "volume_mult",
+               "Final Balance", "Profit", "Max Drawdown (%)", "Hit Rate (%)", "Total Trades"]
+    table = pd.DataFrame(results, columns=columns)
+    return table.sort_values(["Profit", "Hit Rate (%)"], ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros da estratégia.")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT"])
+    parser.add_argument("--timeframes", nargs="+", default=["1h"])
+    parser.add_argument("--bars", type=int, default=1000, help="quantidade de velas por par/timeframe")
+    parser.add_argument("--offline", action="store_true", help="usa apenas o histórico salvo em disco")
+    parser.add_argument("--data-dir", default=ohlcv_store.root, help="diretório do histórico local de velas")
+    parser.add_argument("--top", type=int, default=10, help="quantidade de linhas exibidas por par/timeframe")
+    args = parser.parse_args()
+    ohlcv_store.root = args.data_dir
+
+    tables = []
+    for symbol in args.symbols:
+        for timeframe in args.timeframes:
+            df = fetch_historical_data(symbol, timeframe, max_data_points=args.bars, offline=args.offline)
+            start = time.perf_counter()
+            table = run_sweep(df)
+            elapsed = time.perf_counter() - start
+            print(f"{symbol} ({timeframe}): {len(table)} combinações em {elapsed:.2f}s "
+                  f"({len(table) / elapsed:,.0f} combinações/s)")
+            print(table.head(args.top).to_string(index=False))
+            tables.append(table.assign(Symbol=symbol, Timeframe=timeframe))
+
+    output_file = f"sweep_results_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+    pd.concat(tables, ignore_index=True).to_csv(output_file, index=False)
+    print(f"Resultados salvos no arquivo: {output_file}")